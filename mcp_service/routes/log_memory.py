@@ -4,34 +4,173 @@ Handles logging interactions to Supabase memory store
 """
 
 from fastapi import APIRouter, HTTPException, Depends
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 try:
     from pydantic import EmailStr
 except ImportError:
     from email_validator import EmailStr
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, Iterable, Iterator, List, Tuple
+from dataclasses import dataclass
+import base64
+import binascii
+import json
 import logging
+import time
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from ..utils.supabase_client import get_supabase_client
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Short-lived cache for /memory_analytics results, keyed on days_back.
+# Dashboards poll this endpoint far more often than the underlying data changes.
+ANALYTICS_CACHE_TTL_SECONDS = 60
+ANALYTICS_CACHE_MAX_SIZE = 128
+_analytics_cache: Dict[int, Tuple[float, Dict[str, Any]]] = {}
+
+def _get_cached_analytics(days_back: int) -> Optional[Dict[str, Any]]:
+    """Return cached analytics for days_back if the entry has not expired"""
+    entry = _analytics_cache.get(days_back)
+    if entry is None:
+        return None
+    
+    expires_at, analytics = entry
+    if expires_at <= time.monotonic():
+        _analytics_cache.pop(days_back, None)
+        return None
+    
+    return analytics
+
+def _store_cached_analytics(days_back: int, analytics: Dict[str, Any]) -> None:
+    """Cache analytics for days_back, evicting the oldest entry when full"""
+    if days_back not in _analytics_cache and len(_analytics_cache) >= ANALYTICS_CACHE_MAX_SIZE:
+        _analytics_cache.pop(next(iter(_analytics_cache)))
+    
+    _analytics_cache[days_back] = (time.monotonic() + ANALYTICS_CACHE_TTL_SECONDS, analytics)
+
+def invalidate_analytics_cache() -> None:
+    """Drop all cached analytics so the next request recomputes them"""
+    _analytics_cache.clear()
+
+# Column projections - avoid shipping large JSONB blobs the caller never reads
+ANALYTICS_COLUMNS = "interaction_type,resolution_type,sentiment_analysis->score,ticket_id,created_at"
+MEMORY_SEARCH_COLUMNS = (
+    "id,interaction_type,customer_email,customer_phone,issue_description,"
+    "resolution_type,ticket_id,sentiment_analysis,tags,status,created_at,updated_at"
+)
+
+# Rows fetched per round-trip when streaming interactions into analytics
+ANALYTICS_PAGE_SIZE = 1000
+
+def iter_interactions(supabase, days_back: int, page_size: int = ANALYTICS_PAGE_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Yield interactions from the last days_back days, one page at a time
+    
+    Ordered by (created_at, id): created_at alone isn't unique, and rows tied
+    on it could shift across page boundaries and be counted twice or skipped.
+    """
+    cutoff_date = (datetime.utcnow() - timedelta(days=days_back)).isoformat()
+    offset = 0
+    
+    while True:
+        result = supabase.table("support_interactions")\
+            .select(ANALYTICS_COLUMNS)\
+            .gte("created_at", cutoff_date)\
+            .order("created_at")\
+            .order("id")\
+            .range(offset, offset + page_size - 1)\
+            .execute()
+        
+        rows = result.data if result.data else []
+        yield from rows
+        
+        if len(rows) < page_size:
+            break
+        offset += page_size
+
+def encode_search_cursor(row: Dict[str, Any]) -> str:
+    """Opaque, URL-safe memory search cursor for a row's (created_at, id) keyset"""
+    payload = json.dumps([row["created_at"], row["id"]], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_search_cursor(cursor: str) -> Tuple[str, str]:
+    """Decode a memory search cursor, raising ValueError if it is malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as e:
+        raise ValueError(f"malformed cursor: {e}") from e
+    
+    created_at, row_id = str(created_at), str(row_id)
+    # Values are embedded in a quoted PostgREST filter, so keep them plain
+    if any(char in value for value in (created_at, row_id) for char in '"\\'):
+        raise ValueError("malformed cursor")
+    return created_at, row_id
+
+class AIAnalysis(BaseModel):
+    """AI issue analysis attached to an interaction (unlisted Bedrock keys are kept)"""
+    model_config = ConfigDict(extra="allow", str_strip_whitespace=True)
+    
+    issue_summary: Optional[str] = None
+    urgency_level: Optional[str] = None
+    suggested_category: Optional[str] = None
+    category: Optional[str] = None
+    key_points: Optional[List[str]] = None
+    complexity_level: Optional[str] = None
+    estimated_resolution_time: Optional[str] = None
+    requires_escalation: Optional[bool] = None
+    suggested_actions: Optional[List[str]] = None
+    # Urgency prompt
+    urgency_score: Optional[float] = None
+    urgency_indicators: Optional[List[str]] = None
+    business_impact: Optional[str] = None
+    time_sensitivity: Optional[str] = None
+    # General analysis prompt
+    summary: Optional[str] = None
+    urgency: Optional[str] = None
+    sentiment: Optional[str] = None
+    next_steps: Optional[List[str]] = None
+    keywords: Optional[List[str]] = None
+
+class SentimentAnalysis(BaseModel):
+    """Sentiment analysis attached to an interaction (unlisted Bedrock keys are kept)"""
+    model_config = ConfigDict(extra="allow", str_strip_whitespace=True)
+    
+    score: Optional[float] = None
+    sentiment_score: Optional[float] = None
+    sentiment_label: Optional[str] = None
+    confidence: Optional[float] = None
+    frustration_level: Optional[str] = None
+    urgency_level: Optional[str] = None
+    escalation_needed: Optional[bool] = None
+    key_emotions: Optional[List[str]] = None
+    urgency_keywords: Optional[List[str]] = None
+    customer_tone_progression: Optional[str] = None
+    resolution_satisfaction: Optional[str] = None
+    emotional_indicators: Optional[List[str]] = None
+    tone: Optional[str] = None
+
 class LogMemoryRequest(BaseModel):
+    model_config = ConfigDict(extra="ignore", str_strip_whitespace=True)
+    
     interaction_type: str = Field(..., description="Type of interaction")
     customer_email: Optional[EmailStr] = Field(None, description="Customer email")
     customer_phone: Optional[str] = Field(None, description="Customer phone number")
     issue_description: str = Field(..., description="Description of the issue")
-    ai_analysis: Optional[Dict[str, Any]] = Field(None, description="AI analysis results")
+    ai_analysis: Optional[AIAnalysis] = Field(None, description="AI analysis results")
     resolution_type: Optional[str] = Field(None, description="How the issue was resolved")
     ticket_id: Optional[str] = Field(None, description="Associated ticket ID")
-    sentiment_analysis: Optional[Dict[str, Any]] = Field(None, description="Sentiment analysis results")
+    sentiment_analysis: Optional[SentimentAnalysis] = Field(None, description="Sentiment analysis results")
     metadata: Optional[Dict[str, Any]] = Field(None, description="Additional metadata")
     tags: Optional[List[str]] = Field(default_factory=list, description="Tags for categorization")
 
-class LogMemoryResponse(BaseModel):
+@dataclass(frozen=True)
+class LogMemoryResponse:
+    # Explicit __slots__ (dataclass slots=True needs Python 3.10+)
+    __slots__ = ("log_id", "status", "logged_at")
+    
     log_id: str
     status: str
     logged_at: datetime
@@ -49,6 +188,7 @@ async def log_interaction_memory(
     """
     try:
         log_id = str(uuid.uuid4())
+        now = datetime.utcnow()
         
         logger.info(f"Logging interaction: type={request.interaction_type}, id={log_id}")
         
@@ -59,13 +199,15 @@ async def log_interaction_memory(
             "customer_email": request.customer_email,
             "customer_phone": request.customer_phone,
             "issue_description": request.issue_description,
-            "ai_analysis": request.ai_analysis,
+            "ai_analysis": request.ai_analysis.model_dump(exclude_unset=True) if request.ai_analysis else None,
             "resolution_type": request.resolution_type,
             "ticket_id": request.ticket_id,
-            "sentiment_analysis": request.sentiment_analysis,
+            "sentiment_analysis": (
+                request.sentiment_analysis.model_dump(exclude_unset=True) if request.sentiment_analysis else None
+            ),
             "metadata": request.metadata,
             "tags": request.tags,
-            "created_at": datetime.utcnow().isoformat()
+            "created_at": now.isoformat()
         }
         
         # Insert into Supabase
@@ -74,10 +216,12 @@ async def log_interaction_memory(
         if not result.data:
             raise Exception("Failed to insert log data")
         
+        invalidate_analytics_cache()
+        
         response = LogMemoryResponse(
             log_id=log_id,
             status="logged",
-            logged_at=datetime.utcnow()
+            logged_at=now
         )
         
         logger.info(f"Interaction logged successfully: {log_id}")
@@ -96,21 +240,29 @@ async def search_interaction_memory(
     customer_phone: Optional[str] = None,
     interaction_type: Optional[str] = None,
     ticket_id: Optional[str] = None,
+    tag: Optional[str] = None,
     days_back: int = 30,
     limit: int = 50,
+    full: bool = False,
+    cursor: Optional[str] = None,
     supabase=Depends(get_supabase_client)
 ):
     """
     Search interaction memory for historical data
     
     Retrieves past interactions based on search criteria
-    for context and pattern analysis.
+    for context and pattern analysis. Set full=true to include
+    the ai_analysis and metadata blobs.
+    
+    Results are paged newest first by (created_at, id): pass the
+    returned next_cursor as cursor to fetch the next (older) page.
     """
     try:
         logger.info(f"Searching memory: email={customer_email}, type={interaction_type}")
         
         # Build query
-        query = supabase.table("support_interactions").select("*")
+        columns = "*" if full else MEMORY_SEARCH_COLUMNS
+        query = supabase.table("support_interactions").select(columns)
         
         # Apply filters
         if customer_email:
@@ -125,33 +277,56 @@ async def search_interaction_memory(
         if ticket_id:
             query = query.eq("ticket_id", ticket_id)
         
+        # Array containment - served by the GIN index on tags
+        if tag:
+            query = query.contains("tags", [tag])
+        
         # Date filter
-        from datetime import timedelta
         cutoff_date = (datetime.utcnow() - timedelta(days=days_back)).isoformat()
         query = query.gte("created_at", cutoff_date)
         
+        # Keyset pagination - seek past the last row of the previous page; id
+        # breaks created_at ties so rows sharing a timestamp aren't skipped
+        if cursor:
+            try:
+                cursor_created_at, cursor_id = decode_search_cursor(cursor)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            query = query.or_(
+                f'created_at.lt."{cursor_created_at}",'
+                f'and(created_at.eq."{cursor_created_at}",id.lt."{cursor_id}")'
+            )
+        
         # Order and limit
-        query = query.order("created_at", desc=True).limit(limit)
+        query = query.order("created_at", desc=True).order("id", desc=True).limit(limit)
         
         # Execute query
         result = query.execute()
         
         interactions = result.data if result.data else []
         
+        # A full page means older rows may remain
+        next_cursor = encode_search_cursor(interactions[-1]) if len(interactions) >= limit else None
+        
         logger.info(f"Memory search completed: {len(interactions)} results")
         
         return {
             "interactions": interactions,
             "total_found": len(interactions),
+            "next_cursor": next_cursor,
             "search_criteria": {
                 "customer_email": customer_email,
                 "customer_phone": customer_phone,
                 "interaction_type": interaction_type,
                 "ticket_id": ticket_id,
-                "days_back": days_back
+                "tag": tag,
+                "days_back": days_back,
+                "cursor": cursor
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Memory search failed: {e}", exc_info=True)
         raise HTTPException(
@@ -171,22 +346,18 @@ async def get_memory_analytics(
     for performance monitoring and improvement.
     """
     try:
-        logger.info(f"Generating memory analytics for last {days_back} days")
-        
-        # Date filter
-        from datetime import timedelta
-        cutoff_date = (datetime.utcnow() - timedelta(days=days_back)).isoformat()
+        cached = _get_cached_analytics(days_back)
+        if cached is not None:
+            logger.debug(f"Serving cached memory analytics for last {days_back} days")
+            return cached
         
-        # Get all interactions in date range
-        result = supabase.table("support_interactions")\
-            .select("*")\
-            .gte("created_at", cutoff_date)\
-            .execute()
+        logger.info(f"Generating memory analytics for last {days_back} days")
         
-        interactions = result.data if result.data else []
+        # Stream interactions in date range page by page into the aggregation
+        analytics = calculate_interaction_analytics(iter_interactions(supabase, days_back))
         
-        # Calculate analytics
-        analytics = calculate_interaction_analytics(interactions)
+        if "error" not in analytics:
+            _store_cached_analytics(days_back, analytics)
         
         logger.info("Memory analytics generated successfully")
         return analytics
@@ -216,7 +387,8 @@ async def update_interaction_memory(
         # Add update timestamp
         updates["updated_at"] = datetime.utcnow().isoformat()
         
-        # Update record
+        # Single round-trip: PostgREST returns the updated rows (UPDATE ... RETURNING),
+        # so an empty result means the interaction does not exist
         result = supabase.table("support_interactions")\
             .update(updates)\
             .eq("id", interaction_id)\
@@ -225,6 +397,8 @@ async def update_interaction_memory(
         if not result.data:
             raise HTTPException(status_code=404, detail="Interaction not found")
         
+        invalidate_analytics_cache()
+        
         logger.info(f"Interaction updated successfully: {interaction_id}")
         return {
             "interaction_id": interaction_id,
@@ -232,6 +406,8 @@ async def update_interaction_memory(
             "updated_at": updates["updated_at"]
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Interaction update failed: {e}", exc_info=True)
         raise HTTPException(
@@ -239,29 +415,42 @@ async def update_interaction_memory(
             detail=f"Failed to update interaction: {str(e)}"
         )
 
-def calculate_interaction_analytics(interactions: List[Dict]) -> Dict[str, Any]:
-    """Calculate analytics from interaction data"""
+def _sentiment_score(interaction: Dict[str, Any]) -> Optional[float]:
+    """Extract a numeric sentiment score, or None if absent or malformed"""
+    # The score is either projected directly (sentiment_analysis->score)
+    # or nested in the full JSONB object
+    score = interaction.get("score")
+    if score is None:
+        sentiment = interaction.get("sentiment_analysis")
+        if sentiment and isinstance(sentiment, dict):
+            score = sentiment.get("score")
+    
+    if score is None:
+        return None
+    
     try:
-        total_interactions = len(interactions)
-        
-        if total_interactions == 0:
-            return {
-                "total_interactions": 0,
-                "interaction_types": {},
-                "resolution_types": {},
-                "avg_sentiment_score": None,
-                "ticket_creation_rate": 0,
-                "auto_resolution_rate": 0
-            }
-        
-        # Count interaction types
+        return float(score)
+    except (TypeError, ValueError):
+        return None
+
+def calculate_interaction_analytics(interactions: Iterable[Dict]) -> Dict[str, Any]:
+    """Calculate analytics from interaction data in a single pass"""
+    try:
+        total_interactions = 0
         interaction_types = {}
         resolution_types = {}
-        sentiment_scores = []
         tickets_created = 0
         auto_resolved = 0
         
+        # Running sentiment aggregates, so memory does not grow with row count
+        total_scored = 0
+        score_sum = 0.0
+        min_score = None
+        max_score = None
+        
         for interaction in interactions:
+            total_interactions += 1
+            
             # Interaction types
             int_type = interaction.get("interaction_type", "unknown")
             interaction_types[int_type] = interaction_types.get(int_type, 0) + 1
@@ -272,11 +461,12 @@ def calculate_interaction_analytics(interactions: List[Dict]) -> Dict[str, Any]:
                 resolution_types[res_type] = resolution_types.get(res_type, 0) + 1
             
             # Sentiment analysis
-            sentiment = interaction.get("sentiment_analysis")
-            if sentiment and isinstance(sentiment, dict):
-                score = sentiment.get("score")
-                if score is not None:
-                    sentiment_scores.append(float(score))
+            score = _sentiment_score(interaction)
+            if score is not None:
+                total_scored += 1
+                score_sum += score
+                min_score = score if min_score is None else min(min_score, score)
+                max_score = score if max_score is None else max(max_score, score)
             
             # Count tickets and auto-resolutions
             if interaction.get("ticket_id"):
@@ -285,12 +475,22 @@ def calculate_interaction_analytics(interactions: List[Dict]) -> Dict[str, Any]:
             if res_type in ["knowledge_base_match", "auto_resolved"]:
                 auto_resolved += 1
         
+        if total_interactions == 0:
+            return {
+                "total_interactions": 0,
+                "interaction_types": {},
+                "resolution_types": {},
+                "avg_sentiment_score": None,
+                "ticket_creation_rate": 0,
+                "auto_resolution_rate": 0
+            }
+        
         # Calculate rates
         ticket_creation_rate = (tickets_created / total_interactions) * 100
         auto_resolution_rate = (auto_resolved / total_interactions) * 100
         
         # Average sentiment
-        avg_sentiment = sum(sentiment_scores) / len(sentiment_scores) if sentiment_scores else None
+        avg_sentiment = score_sum / total_scored if total_scored else None
         
         return {
             "total_interactions": total_interactions,
@@ -300,13 +500,13 @@ def calculate_interaction_analytics(interactions: List[Dict]) -> Dict[str, Any]:
             "ticket_creation_rate": round(ticket_creation_rate, 2),
             "auto_resolution_rate": round(auto_resolution_rate, 2),
             "sentiment_data": {
-                "total_scored": len(sentiment_scores),
+                "total_scored": total_scored,
                 "avg_score": round(avg_sentiment, 3) if avg_sentiment else None,
-                "min_score": min(sentiment_scores) if sentiment_scores else None,
-                "max_score": max(sentiment_scores) if sentiment_scores else None
+                "min_score": min_score,
+                "max_score": max_score
             }
         }
         
-    except Exception as e:
+    except (TypeError, ValueError, AttributeError) as e:
         logger.error(f"Analytics calculation failed: {e}")
-        return {"error": "Failed to calculate analytics"}
\ No newline at end of file
+        return {"error": "Failed to calculate analytics"}
@@ -3,15 +3,21 @@ Email Sending Route
 Handles sending emails via Gmail API
 """
 
-from fastapi import APIRouter, HTTPException, Depends
-from pydantic import BaseModel, Field
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Query, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
 try:
     from pydantic import EmailStr
 except ImportError:
     from email_validator import EmailStr
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable
+import asyncio
 import logging
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from string import Formatter
+from types import MappingProxyType
 from datetime import datetime
 
 from ..utils.gmail_client import GmailClient
@@ -20,6 +26,47 @@ from ..utils.supabase_client import get_supabase_client
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Email templates, pre-joined around the {body} placeholder so rendering is a
+# single format_map() call
+_EMAIL_TEMPLATES = MappingProxyType({
+    "solution_response": (
+        "Hello {customer_name},\n\nThank you for contacting support."
+        "\n\n{body}"
+        "\n\nBest regards,\nSuperTickets.AI Support Team"
+    ),
+    "ticket_created": (
+        "Hello {customer_name},\n\nWe've received your support request."
+        "\n\n{body}"
+        "\n\nBest regards,\nSuperTickets.AI Support Team\nTicket #{ticket_id}"
+    ),
+    "call_followup_solution": (
+        "Hello {customer_name},\n\nThank you for calling our support line."
+        "\n\n{body}"
+        "\n\nBest regards,\n{agent_name}\nSuperTickets.AI Support Team"
+    ),
+    "call_ticket_confirmation": (
+        "Hello {customer_name},\n\nThis confirms your support ticket creation."
+        "\n\n{body}"
+        "\n\nBest regards,\nSuperTickets.AI Support Team\nTicket #{ticket_id}"
+    ),
+})
+
+_TEMPLATE_DEFAULTS = MappingProxyType({
+    "customer_name": "Valued Customer",
+    "agent_name": "Support Agent",
+    "ticket_id": "TBD"
+})
+
+# Maximum Gmail sends in flight at once during a bulk send
+BULK_EMAIL_CONCURRENCY = 20
+
+# googleapiclient's execute() blocks, so bulk sends run on their own threads;
+# sized to the concurrency cap rather than the default executor's CPU-based limit
+_BULK_SEND_EXECUTOR = ThreadPoolExecutor(
+    max_workers=BULK_EMAIL_CONCURRENCY,
+    thread_name_prefix="gmail-bulk-send"
+)
+
 class SendEmailRequest(BaseModel):
     to: EmailStr = Field(..., description="Recipient email address")
     subject: str = Field(..., description="Email subject")
@@ -39,26 +86,55 @@ class SendEmailResponse(BaseModel):
     recipient: str
     subject: str
 
-@router.post("/send_email", response_model=SendEmailResponse)
+# Built at import so the first request doesn't pay for validator construction;
+# validate_json() parses the raw body straight into the model
+_SEND_EMAIL_ADAPTER = TypeAdapter(SendEmailRequest)
+
+# Responses are plain dicts encoded by orjson - SendEmailResponse only documents
+# the shape in OpenAPI and is not used to validate or serialize at runtime.
+# The body is validated by _SEND_EMAIL_ADAPTER, so its schema is declared here
+@router.post(
+    "/send_email",
+    response_class=ORJSONResponse,
+    responses={
+        200: {"model": SendEmailResponse, "description": "Email sent (wait=true)"},
+        202: {"description": "Email queued for background sending"}
+    },
+    openapi_extra={
+        "requestBody": {
+            "content": {"application/json": {"schema": SendEmailRequest.model_json_schema()}},
+            "required": True
+        }
+    }
+)
 async def send_email_response(
-    request: SendEmailRequest,
+    http_request: Request,
+    background_tasks: BackgroundTasks,
+    wait: bool = Query(False, description="Send before responding and return the Gmail message ID"),
     supabase=Depends(get_supabase_client)
 ):
     """
     Send email response via Gmail API
     
     This endpoint sends emails using the Gmail API with support for
-    threading, templates, and attachments.
+    threading, templates, and attachments. By default the send runs as a
+    background task after the response; pass wait=true to block until
+    Gmail accepts the message.
     """
+    try:
+        request = _SEND_EMAIL_ADAPTER.validate_json(await http_request.body())
+    except ValidationError as e:
+        # Same "body"-rooted error locations FastAPI reports for its own validation
+        raise RequestValidationError(
+            [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)]
+        )
+    
     try:
         logger.info(f"Sending email to {request.to}: '{request.subject}'")
         
-        # Initialize Gmail client
-        gmail_client = GmailClient()
-        
         # Process email template if specified
         if request.template:
-            processed_body = await process_email_template(
+            processed_body = process_email_template(
                 template_name=request.template,
                 body=request.body,
                 recipient=request.to
@@ -78,27 +154,26 @@ async def send_email_response(
             "reply_to": request.reply_to
         }
         
-        # Send email via Gmail API
-        send_result = await gmail_client.send_email(email_data)
+        if not wait:
+            background_tasks.add_task(send_email_in_background, supabase, email_data)
+            return ORJSONResponse({
+                "status": "queued",
+                "queued_at": datetime.utcnow(),
+                "recipient": request.to,
+                "subject": request.subject
+            }, status_code=202)
         
-        # Log email sending
-        await log_email_sent(
-            supabase=supabase,
-            email_data=email_data,
-            send_result=send_result
-        )
-        
-        response = SendEmailResponse(
-            message_id=send_result["message_id"],
-            thread_id=send_result["thread_id"],
-            status="sent",
-            sent_at=datetime.utcnow(),
-            recipient=request.to,
-            subject=request.subject
-        )
+        send_result = await send_and_log_email(supabase, email_data)
         
         logger.info(f"Email sent successfully: {send_result['message_id']}")
-        return response
+        return ORJSONResponse({
+            "message_id": send_result["message_id"],
+            "thread_id": send_result["thread_id"],
+            "status": "sent",
+            "sent_at": datetime.utcnow(),
+            "recipient": request.to,
+            "subject": request.subject
+        })
         
     except Exception as e:
         logger.error(f"Email sending failed: {e}", exc_info=True)
@@ -107,7 +182,27 @@ async def send_email_response(
             detail=f"Failed to send email: {str(e)}"
         )
 
-@router.post("/send_bulk_email")
+async def send_and_log_email(supabase, email_data: dict) -> Dict[str, Any]:
+    """Send one email via Gmail API and log it to Supabase"""
+    gmail_client = GmailClient()
+    send_result = await gmail_client.send_email(email_data)
+    
+    await log_email_sent(
+        supabase=supabase,
+        email_data=email_data,
+        send_result=send_result
+    )
+    return send_result
+
+async def send_email_in_background(supabase, email_data: dict):
+    """Background task wrapper - there is no caller left to report failures to"""
+    try:
+        send_result = await send_and_log_email(supabase, email_data)
+        logger.info(f"Queued email sent successfully: {send_result['message_id']}")
+    except Exception as e:
+        logger.error(f"Queued email to {email_data['to']} failed: {e}", exc_info=True)
+
+@router.post("/send_bulk_email", response_class=ORJSONResponse)
 async def send_bulk_emails(
     request: Dict[str, Any],
     supabase=Depends(get_supabase_client)
@@ -129,21 +224,29 @@ async def send_bulk_emails(
         
         logger.info(f"Sending bulk email to {len(recipients)} recipients")
         
-        gmail_client = GmailClient()
-        results = []
+        # httplib2 is not thread-safe, so every in-flight send gets its own
+        # client; idle clients are reused, capping them at BULK_EMAIL_CONCURRENCY.
+        # The first one is built up front so auth failures fail the whole request
+        idle_clients = [GmailClient()]
+        semaphore = asyncio.Semaphore(BULK_EMAIL_CONCURRENCY)
+        loop = asyncio.get_running_loop()
         
-        for recipient_data in recipients:
+        # Subject and body are shared by every recipient - parse them once
+        render_subject = compile_personalizer(subject_template)
+        render_body = compile_personalizer(body_template)
+        
+        async def send_to_recipient(recipient_data: Dict[str, Any]) -> Dict[str, Any]:
+            recipient_email = recipient_data.get("email")
             try:
-                recipient_email = recipient_data.get("email")
                 personalization = recipient_data.get("personalization", {})
                 
                 # Personalize subject and body
-                personalized_subject = personalize_content(subject_template, personalization)
-                personalized_body = personalize_content(body_template, personalization)
+                personalized_subject = render_subject(personalization)
+                personalized_body = render_body(personalization)
                 
                 # Process template if specified
                 if template_name:
-                    personalized_body = await process_email_template(
+                    personalized_body = process_email_template(
                         template_name=template_name,
                         body=personalized_body,
                         recipient=recipient_email,
@@ -157,33 +260,47 @@ async def send_bulk_emails(
                     "body": personalized_body
                 }
                 
-                send_result = await gmail_client.send_email(email_data)
-                results.append({
-                    "recipient": recipient_email,
-                    "status": "sent",
-                    "message_id": send_result["message_id"]
-                })
+                async with semaphore:
+                    gmail_client = idle_clients.pop() if idle_clients else GmailClient()
+                    try:
+                        send_result = await loop.run_in_executor(
+                            _BULK_SEND_EXECUTOR, gmail_client.send_message, email_data
+                        )
+                    finally:
+                        idle_clients.append(gmail_client)
                 
                 # Log individual email
                 await log_email_sent(supabase, email_data, send_result)
                 
+                return {
+                    "recipient": recipient_email,
+                    "status": "sent",
+                    "message_id": send_result["message_id"]
+                }
+                
             except Exception as e:
                 logger.error(f"Failed to send email to {recipient_email}: {e}")
-                results.append({
+                return {
                     "recipient": recipient_email,
                     "status": "failed",
                     "error": str(e)
-                })
+                }
+        
+        # Send concurrently, at most BULK_EMAIL_CONCURRENCY in flight; gather
+        # keeps results in recipient order
+        results = await asyncio.gather(
+            *(send_to_recipient(recipient_data) for recipient_data in recipients)
+        )
         
         successful_sends = len([r for r in results if r["status"] == "sent"])
         logger.info(f"Bulk email completed: {successful_sends}/{len(recipients)} sent")
         
-        return {
+        return ORJSONResponse({
             "total_recipients": len(recipients),
             "successful_sends": successful_sends,
             "failed_sends": len(recipients) - successful_sends,
             "results": results
-        }
+        })
         
     except Exception as e:
         logger.error(f"Bulk email sending failed: {e}", exc_info=True)
@@ -225,7 +342,7 @@ async def check_gmail_integration_status():
             "stats": None
         }
 
-async def process_email_template(
+def process_email_template(
     template_name: str, 
     body: str, 
     recipient: str, 
@@ -233,67 +350,107 @@ async def process_email_template(
 ) -> str:
     """Process email template with personalization"""
     try:
-        # Load template configuration
-        templates = {
-            "solution_response": {
-                "header": "Hello {customer_name},\n\nThank you for contacting support.",
-                "footer": "\n\nBest regards,\nSuperTickets.AI Support Team"
-            },
-            "ticket_created": {
-                "header": "Hello {customer_name},\n\nWe've received your support request.",
-                "footer": "\n\nBest regards,\nSuperTickets.AI Support Team\nTicket #{ticket_id}"
-            },
-            "call_followup_solution": {
-                "header": "Hello {customer_name},\n\nThank you for calling our support line.",
-                "footer": "\n\nBest regards,\n{agent_name}\nSuperTickets.AI Support Team"
-            },
-            "call_ticket_confirmation": {
-                "header": "Hello {customer_name},\n\nThis confirms your support ticket creation.",
-                "footer": "\n\nBest regards,\nSuperTickets.AI Support Team\nTicket #{ticket_id}"
-            }
-        }
-        
-        if template_name not in templates:
+        template = _EMAIL_TEMPLATES.get(template_name)
+        if template is None:
             return body
         
-        template = templates[template_name]
-        
-        # Apply personalization
+        # Missing personalization values fall back to the defaults
+        values = _SafeDict(_TEMPLATE_DEFAULTS)
         if personalization:
-            header = template["header"].format(**personalization)
-            footer = template["footer"].format(**personalization)
-        else:
-            # Use default values
-            default_values = {
-                "customer_name": "Valued Customer",
-                "agent_name": "Support Agent",
-                "ticket_id": "TBD"
-            }
-            header = template["header"].format(**default_values)
-            footer = template["footer"].format(**default_values)
+            values.update(personalization)
+        values["body"] = body
         
-        return f"{header}\n\n{body}{footer}"
+        return template.format_map(values)
         
     except Exception as e:
         logger.error(f"Template processing failed: {e}")
         return body  # Return original body if template processing fails
 
+class _SafeDict(dict):
+    """format_map() mapping that leaves unknown placeholders untouched"""
+    
+    def __missing__(self, key: str) -> str:
+        return "{" + key + "}"
+
 def personalize_content(content: str, personalization: Dict) -> str:
     """Personalize content with variable substitution"""
     try:
         if not personalization:
             return content
         
-        for key, value in personalization.items():
-            placeholder = "{" + key + "}"
-            content = content.replace(placeholder, str(value))
-        
-        return content
+        try:
+            # One pass over the placeholders instead of a replace() per key
+            return content.format_map(_SafeDict(personalization))
+        except (ValueError, IndexError, AttributeError):
+            # Literal braces (JSON, code) aren't valid format fields - fall
+            # back to substituting the named placeholders only
+            return _replace_placeholders(content, personalization)
         
     except Exception as e:
         logger.error(f"Content personalization failed: {e}")
         return content
 
+def _replace_placeholders(content: str, personalization: Dict) -> str:
+    """Substitute named {key} placeholders one key at a time"""
+    for key, value in personalization.items():
+        placeholder = "{" + key + "}"
+        content = content.replace(placeholder, str(value))
+    return content
+
+# str.format() conversion flags, for applying !r/!s/!a without re-parsing
+_CONVERTERS = MappingProxyType({None: None, "r": repr, "s": str, "a": ascii})
+
+def compile_personalizer(content: str) -> Callable[[Dict], str]:
+    """
+    Parse content once into literal chunks and field slots and return a
+    renderer equivalent to personalize_content(content, personalization),
+    which only joins strings per recipient
+    """
+    if "{" not in content and "}" not in content:
+        return lambda personalization: content
+    
+    try:
+        parsed = list(Formatter().parse(content))
+    except ValueError:
+        # Literal braces - personalize_content would fall back on every call
+        return lambda personalization: (
+            _replace_placeholders(content, personalization) if personalization else content
+        )
+    
+    # (literal text, (field name, converter, format spec) or None) pairs
+    chunks = []
+    for literal, field_name, format_spec, conversion in parsed:
+        if field_name is None:
+            chunks.append((literal, None))
+            continue
+        if not field_name.isidentifier() or "{" in format_spec or conversion not in _CONVERTERS:
+            # Positional, attribute/index, nested or invalid fields - leave them to format_map()
+            return lambda personalization: personalize_content(content, personalization)
+        chunks.append((literal, (field_name, _CONVERTERS[conversion], format_spec)))
+    
+    def render(personalization: Dict) -> str:
+        if not personalization:
+            return content
+        
+        parts = []
+        for literal, slot in chunks:
+            parts.append(literal)
+            if slot is None:
+                continue
+            name, convert, format_spec = slot
+            # Same as format_map(_SafeDict(...)): unknown names stay as {name}
+            value = personalization.get(name, "{" + name + "}")
+            if convert is not None:
+                value = convert(value)
+            try:
+                parts.append(format(value, format_spec))
+            except Exception:
+                # e.g. a numeric spec given a string - take the slow path's fallback
+                return personalize_content(content, personalization)
+        return "".join(parts)
+    
+    return render
+
 async def log_email_sent(supabase, email_data: dict, send_result: dict):
     """Log email sending to Supabase for tracking"""
     try:
@@ -315,7 +472,6 @@ async def log_email_sent(supabase, email_data: dict, send_result: dict):
         logger.error(f"Failed to log email sending: {e}")
 
 # Email Automation Status (Auto-Running)
-import asyncio
 from datetime import datetime, timedelta
 
 # Global automation state - starts automatically
@@ -4,6 +4,7 @@ Handles email sending and receiving via Gmail API
 """
 
 import os
+import asyncio
 import logging
 import base64
 import email
@@ -66,7 +67,16 @@ class GmailClient:
             raise
     
     async def send_email(self, email_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Send email via Gmail API"""
+        """Send email via Gmail API without blocking the event loop"""
+        return await asyncio.to_thread(self.send_message, email_data)
+    
+    def send_message(self, email_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Send email via Gmail API, blocking until the request completes
+        
+        The underlying httplib2 transport is not thread-safe, so a client
+        must only be used by one thread at a time.
+        """
         try:
             # Create message
             message = self._create_message(
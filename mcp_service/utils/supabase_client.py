@@ -6,10 +6,16 @@ Handles database operations and vector search
 import os
 import logging
 from typing import Optional, Dict, Any, List
-from supabase import create_client, Client
+import httpx
+from supabase import create_client, Client, ClientOptions
 
 logger = logging.getLogger(__name__)
 
+# Shared HTTP/2 connection pool for PostgREST calls - concurrent requests
+# multiplex over a few connections instead of queueing behind HTTP/1.1
+SUPABASE_HTTP_TIMEOUT_SECONDS = 10.0
+SUPABASE_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=32, max_connections=64)
+
 class SupabaseClient:
     """Supabase client for database operations"""
     
@@ -20,7 +26,16 @@ class SupabaseClient:
         if not self.url or not self.key:
             raise ValueError("SUPABASE_URL and SUPABASE_KEY environment variables are required")
         
-        self.client: Client = create_client(self.url, self.key)
+        self.http_client = httpx.Client(
+            http2=True,
+            timeout=SUPABASE_HTTP_TIMEOUT_SECONDS,
+            limits=SUPABASE_HTTP_LIMITS
+        )
+        self.client: Client = create_client(
+            self.url,
+            self.key,
+            options=ClientOptions(httpx_client=self.http_client)
+        )
         logger.info("Supabase client initialized")
     
     def table(self, table_name: str):
@@ -221,6 +236,11 @@ def create_supabase_tables():
         ON support_interactions(customer_email);
         """,
         
+        """
+        CREATE INDEX IF NOT EXISTS idx_support_interactions_customer_email_created_at 
+        ON support_interactions(customer_email, created_at DESC);
+        """,
+        
         """
         CREATE INDEX IF NOT EXISTS idx_support_interactions_ticket_id 
         ON support_interactions(ticket_id);
@@ -231,6 +251,11 @@ def create_supabase_tables():
         ON support_interactions(created_at);
         """,
         
+        """
+        CREATE INDEX IF NOT EXISTS idx_support_interactions_tags 
+        ON support_interactions USING GIN (tags);
+        """,
+        
         """
         CREATE INDEX IF NOT EXISTS idx_knowledge_base_category 
         ON knowledge_base(category);
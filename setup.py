@@ -46,6 +46,8 @@ setup(
             "pytest>=7.4.3",
             "pytest-asyncio>=0.21.1",
             "pytest-cov>=4.1.0",
+            "pytest-xdist>=3.5.0",
+            "tzdata>=2023.3",
             "black>=23.11.0",
             "flake8>=6.1.0",
             "mypy>=1.7.1",
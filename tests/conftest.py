@@ -3,10 +3,14 @@ Pytest configuration and shared fixtures
 """
 
 import pytest
+import pytest_asyncio
 import asyncio
 import os
-from unittest.mock import Mock, AsyncMock
-from typing import Generator, Dict, Any
+from unittest.mock import Mock, AsyncMock, patch
+from types import MappingProxyType
+from typing import AsyncGenerator, Generator, Dict, Any
+
+from tests.fakes.gmail import DEFAULT_GMAIL_RESPONSE, make_gmail_stub
 
 # Set test environment variables
 os.environ["TESTING"] = "true"
@@ -23,6 +27,28 @@ def event_loop() -> Generator:
     yield loop
     loop.close()
 
+@pytest.fixture(scope="session")
+def client() -> Generator:
+    """FastAPI test client shared by the session, so the app lifespan runs once"""
+    # Imported lazily so pure-logic tests never load fastapi/starlette/httpx
+    from fastapi.testclient import TestClient
+    from mcp_service.main import app
+    from mcp_service.services.email_automation_service import email_automation_service
+    
+    # Never let the lifespan start monitoring (or OAuth into) a real Gmail inbox
+    with patch.object(email_automation_service, "initialize", AsyncMock(return_value=False)), \
+            TestClient(app) as test_client:
+        yield test_client
+
+@pytest_asyncio.fixture
+async def async_client() -> AsyncGenerator:
+    """Async HTTP client driving the app in-process over ASGI, with no thread portal"""
+    from httpx import AsyncClient, ASGITransport
+    from mcp_service.main import app
+    
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as test_client:
+        yield test_client
+
 @pytest.fixture
 def mock_supabase_client():
     """Mock Supabase client for testing"""
@@ -151,6 +177,47 @@ def mock_calendar_client():
     })
     return mock_client
 
+@pytest.fixture(scope="session")
+def _calendar_mock_template():
+    """Google Calendar client mock built once per session"""
+    mock_client = Mock()
+    mock_client.create_meeting = AsyncMock()
+    mock_client.update_meeting = AsyncMock()
+    mock_client.cancel_meeting = AsyncMock()
+    mock_client.check_availability = AsyncMock()
+    return mock_client
+
+@pytest.fixture
+def calendar_mock(_calendar_mock_template):
+    """Shared Google Calendar client mock, reset to a clean state for each test"""
+    _calendar_mock_template.reset_mock(return_value=True, side_effect=True)
+    return _calendar_mock_template
+
+@pytest.fixture(scope="session")
+def mock_gmail_response():
+    """Mock Gmail API send response (read-only, shared across tests)"""
+    return DEFAULT_GMAIL_RESPONSE
+
+@pytest.fixture
+def gmail_stub():
+    """Fresh Gmail client stub with the default send response"""
+    return make_gmail_stub()
+
+@pytest.fixture(scope="session")
+def valid_email_request():
+    """Valid email sending request (read-only, shared across tests)"""
+    return MappingProxyType({
+        "to": "customer@example.com",
+        "subject": "Re: Your Support Request",
+        "body": "Thank you for contacting support. Here's the solution to your issue...",
+        "thread_id": None,
+        "template": None,
+        "attachments": [],
+        "cc": [],
+        "bcc": [],
+        "reply_to": None
+    })
+
 @pytest.fixture
 def mock_embedding_search():
     """Mock embedding search for testing"""
@@ -0,0 +1,107 @@
+"""
+Gmail client fakes for testing
+
+Stand-ins for GmailClient wherever routes construct it, recording sent
+emails and answering the profile lookup used by the status endpoint, plus a
+blocking Gmail API service for exercising the real client's threading.
+"""
+
+import threading
+import time
+from types import MappingProxyType
+
+DEFAULT_GMAIL_RESPONSE = MappingProxyType({
+    "message_id": "msg_12345",
+    "thread_id": "thread_67890",
+    "status": "sent"
+})
+
+class _GmailStub:
+    """Minimal GmailClient stand-in that records the emails it sends"""
+    
+    def __init__(self, response, service):
+        self.response = response
+        self.service = service
+        self.sent = []
+    
+    def send_message(self, email_data):
+        self.sent.append(email_data)
+        return self.response
+    
+    async def send_email(self, email_data):
+        return self.send_message(email_data)
+
+class _ProfileServiceStub:
+    """Gmail API service stub answering users().getProfile().execute()"""
+    
+    def __init__(self, profile):
+        self._profile = profile
+    
+    def users(self):
+        return self
+    
+    def getProfile(self, **kwargs):
+        return self
+    
+    def execute(self):
+        return self._profile
+
+class BlockingSendRecorder:
+    """
+    Hands out Gmail API service stubs whose send().execute() blocks like the
+    real httplib2 call, tracking how many sends overlap across all of them
+    """
+    
+    def __init__(self, delay):
+        self.delay = delay
+        self.services = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+    
+    def service(self, *args, **kwargs):
+        """New service stub, for patching GmailClient._authenticate"""
+        service = _BlockingSendService(self)
+        self.services.append(service)
+        return service
+    
+    def _enter(self):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+    
+    def _exit(self):
+        with self._lock:
+            self.in_flight -= 1
+
+class _BlockingSendService:
+    """Gmail API service stub answering users().messages().send().execute()"""
+    
+    def __init__(self, recorder):
+        self._recorder = recorder
+        self._busy = False
+    
+    def users(self):
+        return self
+    
+    def messages(self):
+        return self
+    
+    def send(self, **kwargs):
+        return self
+    
+    def execute(self):
+        # httplib2 is not thread-safe: a service must never be shared mid-call
+        assert not self._busy, "Gmail service used by two threads at once"
+        self._busy = True
+        self._recorder._enter()
+        try:
+            time.sleep(self._recorder.delay)
+        finally:
+            self._recorder._exit()
+            self._busy = False
+        return {"id": "msg_12345", "threadId": "thread_67890"}
+
+def make_gmail_stub(response=DEFAULT_GMAIL_RESPONSE, profile=None):
+    """Build the canonical GmailClient fake used wherever the client is patched"""
+    return _GmailStub(response, _ProfileServiceStub(profile or {}))
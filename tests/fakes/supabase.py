@@ -0,0 +1,329 @@
+"""
+In-memory Supabase fake for testing
+
+Implements the subset of the supabase-py fluent query builder used by the
+routes (table().select().eq().contains().gte().lt().or_().order().limit().range().execute(),
+insert() and update()) on top of an in-memory SQLite database, so tests
+exercise real filtering and ordering instead of hand-built Mock chains.
+"""
+
+import json
+import re
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Column definitions mirror create_supabase_tables(); JSON columns are
+# stored as text and decoded again on the way out.
+SUPPORT_INTERACTIONS_COLUMNS = {
+    "id": "text",
+    "interaction_type": "text",
+    "customer_email": "text",
+    "customer_phone": "text",
+    "issue_description": "text",
+    "ai_analysis": "json",
+    "resolution_type": "text",
+    "ticket_id": "text",
+    "meeting_id": "text",
+    "calendar_event_id": "text",
+    "sentiment_analysis": "json",
+    "metadata": "json",
+    "tags": "json",
+    "status": "text",
+    "created_at": "text",
+    "updated_at": "text",
+}
+
+DEFAULT_TABLES = {
+    "support_interactions": SUPPORT_INTERACTIONS_COLUMNS,
+}
+
+_JSON_PATH = re.compile(r"^(\w+)->>?(\w+)$")
+
+# PostgREST filter operators accepted inside or_() expressions
+_LOGIC_OPERATORS = {"eq": "=", "neq": "!=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+def _split_terms(expression: str) -> List[str]:
+    """Split a PostgREST logic expression on top-level commas"""
+    terms, depth, quoted, current = [], 0, False, ""
+    for char in expression:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            terms.append(current)
+            current = ""
+            continue
+        current += char
+    terms.append(current)
+    return terms
+
+class FakeResponse:
+    """Mimics the APIResponse returned by execute()"""
+
+    def __init__(self, data: List[Dict[str, Any]]):
+        self.data = data
+        self.count = len(data)
+
+class FakeQuery:
+    """Fluent query builder translated to SQL on execute()"""
+
+    def __init__(self, fake: "FakeSupabase", table_name: str):
+        self._fake = fake
+        self._table = table_name
+        self._columns = fake.tables[table_name]
+        self._operation = "select"
+        self._projection = "*"
+        self._payload: Any = None
+        self._filters: List[Tuple[str, str, Any]] = []
+        self._orders: List[Tuple[str, bool]] = []
+        self._limit: Optional[int] = None
+        self._offset: Optional[int] = None
+
+    # Operations
+
+    def select(self, columns: str = "*") -> "FakeQuery":
+        self._operation = "select"
+        self._projection = columns
+        return self
+
+    def insert(self, data: Any) -> "FakeQuery":
+        self._operation = "insert"
+        self._payload = data
+        return self
+
+    def update(self, data: Dict[str, Any]) -> "FakeQuery":
+        self._operation = "update"
+        self._payload = data
+        return self
+
+    # Filters
+
+    def eq(self, column: str, value: Any) -> "FakeQuery":
+        return self._filter(column, "=", value)
+
+    def neq(self, column: str, value: Any) -> "FakeQuery":
+        return self._filter(column, "!=", value)
+
+    def gt(self, column: str, value: Any) -> "FakeQuery":
+        return self._filter(column, ">", value)
+
+    def gte(self, column: str, value: Any) -> "FakeQuery":
+        return self._filter(column, ">=", value)
+
+    def lt(self, column: str, value: Any) -> "FakeQuery":
+        return self._filter(column, "<", value)
+
+    def lte(self, column: str, value: Any) -> "FakeQuery":
+        return self._filter(column, "<=", value)
+
+    def or_(self, filters: str) -> "FakeQuery":
+        self._filters.append((None, "or", self._parse_logic("or", filters)))
+        return self
+
+    def contains(self, column: str, values: List[Any]) -> "FakeQuery":
+        self._check_column(column)
+        self._filters.append((column, "contains", list(values)))
+        return self
+
+    def order(self, column: str, desc: bool = False) -> "FakeQuery":
+        self._check_column(column)
+        # Repeated calls add sort keys, as postgrest does
+        self._orders.append((column, desc))
+        return self
+
+    def limit(self, size: int) -> "FakeQuery":
+        self._limit = size
+        return self
+
+    def range(self, start: int, end: int) -> "FakeQuery":
+        self._offset = start
+        self._limit = end - start + 1
+        return self
+
+    def execute(self) -> FakeResponse:
+        if self._operation == "insert":
+            return FakeResponse(self._execute_insert())
+        if self._operation == "update":
+            return FakeResponse(self._execute_update())
+        return FakeResponse(self._execute_select())
+
+    # Internals
+
+    def _filter(self, column: str, op: str, value: Any) -> "FakeQuery":
+        self._check_column(column)
+        self._filters.append((column, op, value))
+        return self
+
+    def _parse_logic(self, joiner: str, expression: str) -> Tuple[str, List[Any]]:
+        """Parse col.op.value terms and nested and()/or() groups into a tree"""
+        nodes = []
+        for term in _split_terms(expression):
+            term = term.strip()
+            group = re.match(r"^(and|or)\((.*)\)$", term)
+            if group:
+                nodes.append(self._parse_logic(*group.groups()))
+                continue
+            column, op, value = term.split(".", 2)
+            self._check_column(column)
+            nodes.append((column, _LOGIC_OPERATORS[op], value.strip('"')))
+        return joiner, nodes
+
+    def _logic_sql(self, node: Tuple[str, List[Any]], params: List[Any]) -> str:
+        joiner, nodes = node
+        clauses = []
+        for child in nodes:
+            if child[0] in ("and", "or"):
+                clauses.append(self._logic_sql(child, params))
+            else:
+                column, op, value = child
+                clauses.append(f"{column} {op} ?")
+                params.append(value)
+        return "(" + f" {joiner.upper()} ".join(clauses) + ")"
+
+    def _check_column(self, column: str) -> None:
+        if column not in self._columns:
+            raise ValueError(f"column {self._table}.{column} does not exist")
+
+    def _where(self) -> Tuple[str, List[Any]]:
+        if not self._filters:
+            return "", []
+        clauses, params = [], []
+        for column, op, value in self._filters:
+            if op == "or":
+                clauses.append(self._logic_sql(value, params))
+            elif op == "contains":
+                # Array containment over a JSON-encoded list column
+                for item in value:
+                    clauses.append(f"EXISTS (SELECT 1 FROM json_each({column}) WHERE value = ?)")
+                    params.append(item)
+            else:
+                clauses.append(f"{column} {op} ?")
+                params.append(self._fake._encode(value))
+        return " WHERE " + " AND ".join(clauses), params
+
+    def _select_list(self) -> Tuple[str, List[str]]:
+        if self._projection.strip() == "*":
+            names = list(self._columns)
+            return ", ".join(names), names
+
+        expressions, names = [], []
+        for item in self._projection.split(","):
+            item = item.strip()
+            match = _JSON_PATH.match(item)
+            if match:
+                column, key = match.groups()
+                self._check_column(column)
+                expressions.append(f"json_extract({column}, '$.{key}') AS {key}")
+                names.append(key)
+            else:
+                self._check_column(item)
+                expressions.append(item)
+                names.append(item)
+        return ", ".join(expressions), names
+
+    def _execute_select(self) -> List[Dict[str, Any]]:
+        select_list, names = self._select_list()
+        where, params = self._where()
+        sql = f"SELECT {select_list} FROM {self._table}{where}"
+        if self._orders:
+            sql += " ORDER BY " + ", ".join(
+                f"{column} {'DESC' if desc else 'ASC'}" for column, desc in self._orders
+            )
+        if self._limit is not None:
+            sql += " LIMIT ?"
+            params.append(self._limit)
+        if self._offset is not None:
+            sql += " OFFSET ?"
+            params.append(self._offset)
+
+        rows = self._fake._run(sql, params).fetchall()
+        return [self._fake._decode_row(self._table, names, row) for row in rows]
+
+    def _execute_insert(self) -> List[Dict[str, Any]]:
+        rows = self._payload if isinstance(self._payload, list) else [self._payload]
+        return [self._fake.insert_row(self._table, row) for row in rows]
+
+    def _execute_update(self) -> List[Dict[str, Any]]:
+        for column in self._payload:
+            self._check_column(column)
+
+        assignments = ", ".join(f"{column} = ?" for column in self._payload)
+        where, params = self._where()
+        values = [self._fake._encode(v) for v in self._payload.values()]
+        self._fake._run(f"UPDATE {self._table} SET {assignments}{where}", values + params)
+
+        # Emulate RETURNING * by re-reading the filtered rows
+        names = list(self._columns)
+        rows = self._fake._run(f"SELECT {', '.join(names)} FROM {self._table}{where}", params).fetchall()
+        return [self._fake._decode_row(self._table, names, row) for row in rows]
+
+class FakeSupabase:
+    """SQLite-backed stand-in for SupabaseClient"""
+
+    def __init__(self, tables: Optional[Dict[str, Dict[str, str]]] = None):
+        self.tables = tables or DEFAULT_TABLES
+        self.statements: List[str] = []
+        self._conn = sqlite3.connect(":memory:", check_same_thread=False)
+        for name, columns in self.tables.items():
+            column_sql = ", ".join(columns)
+            self._conn.execute(f"CREATE TABLE {name} ({column_sql})")
+
+    def table(self, table_name: str) -> FakeQuery:
+        if table_name not in self.tables:
+            raise ValueError(f"relation {table_name} does not exist")
+        return FakeQuery(self, table_name)
+
+    def seed(self, table_name: str, rows: Iterable[Dict[str, Any]]) -> None:
+        """Insert rows directly, bypassing the query builder"""
+        for row in rows:
+            self.insert_row(table_name, row)
+
+    def reset(self) -> None:
+        """Delete all rows and forget recorded statements"""
+        for name in self.tables:
+            self._conn.execute(f"DELETE FROM {name}")
+        self.statements.clear()
+
+    def rows(self, table_name: str) -> List[Dict[str, Any]]:
+        """Return every row of a table, for assertions"""
+        return self.table(table_name).select("*").execute().data
+
+    def insert_row(self, table_name: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        columns = self.tables[table_name]
+        for column in row:
+            if column not in columns:
+                raise ValueError(f"column {table_name}.{column} does not exist")
+
+        placeholders = ", ".join("?" for _ in row)
+        self._run(
+            f"INSERT INTO {table_name} ({', '.join(row)}) VALUES ({placeholders})",
+            [self._encode(v) for v in row.values()]
+        )
+        return dict(row)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _run(self, sql: str, params: List[Any]) -> sqlite3.Cursor:
+        self.statements.append(sql)
+        return self._conn.execute(sql, params)
+
+    @staticmethod
+    def _encode(value: Any) -> Any:
+        if isinstance(value, (dict, list)):
+            return json.dumps(value)
+        if value is not None and not isinstance(value, (str, int, float, bytes)):
+            return str(value)
+        return value
+
+    def _decode_row(self, table_name: str, names: List[str], row: Tuple[Any, ...]) -> Dict[str, Any]:
+        columns = self.tables[table_name]
+        decoded = {}
+        for name, value in zip(names, row):
+            if columns.get(name) == "json" and isinstance(value, str):
+                value = json.loads(value)
+            decoded[name] = value
+        return decoded
@@ -0,0 +1,8 @@
+"""
+Shared assertion helpers for tests
+"""
+
+def expect_ok(response, status=200):
+    """Assert the response status and return the parsed JSON body"""
+    assert response.status_code == status, response.text
+    return response.json()
@@ -8,6 +8,7 @@ from fastapi.testclient import TestClient
 import json
 
 from mcp_service.main import app
+from tests.fakes.gmail import make_gmail_stub
 
 client = TestClient(app)
 
@@ -162,7 +163,7 @@ class TestAPIValidation:
             "body": "Test body"
         }
         
-        with patch('mcp_service.routes.send_email.GmailClient'):
+        with patch('mcp_service.routes.send_email.GmailClient', return_value=make_gmail_stub()):
             with patch('mcp_service.routes.send_email.get_supabase_client'):
                 response = client.post("/mcp/send_email", json=valid_request)
         
@@ -10,6 +10,7 @@ import json
 from datetime import datetime, timedelta
 
 from mcp_service.main import app
+from tests.fakes.gmail import make_gmail_stub
 
 client = TestClient(app)
 
@@ -77,13 +78,9 @@ class TestEmailToTicketWorkflow:
         # Step 3: Send Solution Email
         gmail_response = {"message_id": "msg_123", "thread_id": "thread_123", "status": "sent"}
         
-        with patch('mcp_service.routes.send_email.GmailClient') as mock_gmail:
-            mock_gmail_instance = Mock()
-            mock_gmail_instance.send_email = AsyncMock(return_value=gmail_response)
-            mock_gmail.return_value = mock_gmail_instance
-            
+        with patch('mcp_service.routes.send_email.GmailClient', return_value=make_gmail_stub(gmail_response)):
             with patch('mcp_service.routes.send_email.get_supabase_client', return_value=mock_supabase_client):
-                email_response = client.post("/mcp/send_email", json={
+                email_response = client.post("/mcp/send_email", params={"wait": "true"}, json={
                     "to": "customer@example.com",
                     "subject": "Re: Login Issue - Solution Provided",
                     "body": kb_results[0]["content"],
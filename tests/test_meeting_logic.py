@@ -0,0 +1,224 @@
+"""
+Test meeting scheduling logic
+
+Pure time, conflict and notification logic with no FastAPI app or
+Google Calendar client imports, so it runs without the service stack.
+"""
+
+import pytest
+from bisect import bisect_left
+from datetime import datetime, time, timedelta
+from types import MappingProxyType
+from zoneinfo import ZoneInfo
+
+# Fixed meeting slots shared by the conflict detection tests
+_M1_START = datetime(2024, 1, 15, 14, 0)   # 2:00 PM
+_M1_END = datetime(2024, 1, 15, 15, 0)     # 3:00 PM
+_M2_START = datetime(2024, 1, 15, 14, 30)  # 2:30 PM, overlaps M1
+_M2_END = datetime(2024, 1, 15, 15, 30)    # 3:30 PM
+_M3_START = datetime(2024, 1, 15, 15, 30)  # 3:30 PM, after M1
+_M3_END = datetime(2024, 1, 15, 16, 30)    # 4:30 PM
+
+_ATTENDEE_SCHEDULE = MappingProxyType({
+    "support@company.com": (
+        {"start": _M1_START, "end": _M1_END, "title": "Team Meeting"},
+    )
+})
+
+# 1000 back-to-back half-hour meetings, one starting at the top of every hour
+_BUSY_START = datetime(2024, 1, 1, 0, 0)
+_BUSY_SCHEDULE = MappingProxyType({
+    "busy@company.com": tuple(
+        {
+            "start": _BUSY_START + timedelta(hours=i),
+            "end": _BUSY_START + timedelta(hours=i, minutes=30),
+            "title": f"Meeting {i}"
+        }
+        for i in range(1000)
+    )
+})
+
+# Scheduling helpers exercised by the logic tests below
+
+def is_business_hours(dt, timezone="UTC"):
+    """Check if a time falls within business hours (9 AM - 5 PM weekdays)"""
+    if dt.weekday() >= 5:  # Weekend
+        return False
+    business_start = time(9, 0)
+    business_end = time(17, 0)
+    return business_start <= dt.time() <= business_end
+
+def times_overlap(start1, end1, start2, end2):
+    """Check if two time ranges overlap"""
+    return start1 < end2 and start2 < end1
+
+def index_schedule(schedule):
+    """Sort each attendee's meetings once and keep their start times for bisect"""
+    index = {}
+    for email, meetings in schedule.items():
+        ordered = tuple(sorted(meetings, key=lambda meeting: meeting["start"]))
+        index[email] = (tuple(meeting["start"] for meeting in ordered), ordered)
+    return MappingProxyType(index)
+
+def is_attendee_available(email, start, end, schedule_index):
+    """Check if an attendee has no meeting overlapping the given range
+    
+    Takes index_schedule() output. An attendee's meetings don't overlap each
+    other, so the only candidate conflict is the last meeting starting
+    before ``end`` - found by binary search instead of a linear scan.
+    """
+    if email not in schedule_index:
+        return True
+    
+    starts, meetings = schedule_index[email]
+    idx = bisect_left(starts, end) - 1
+    return not (idx >= 0 and start < meetings[idx]["end"])
+
+# Sorted once at import, searched by every availability check
+_BUSY_INDEX = index_schedule(_BUSY_SCHEDULE)
+
+def should_send_reminder(current_time, reminder_time, meeting_time):
+    """Send if we've passed the reminder time but not the meeting time"""
+    return reminder_time <= current_time < meeting_time
+
+def generate_notification_content(meeting_data, notification_type="reminder"):
+    """Render reminder or confirmation text for a meeting"""
+    if notification_type == "reminder":
+        return f"""
+        Reminder: You have a {meeting_data['meeting_type']} meeting scheduled for {meeting_data['start_time']}.
+        
+        Meeting Link: {meeting_data['meeting_url']}
+        Duration: {meeting_data['duration_minutes']} minutes
+        Related Ticket: {meeting_data['ticket_id']}
+        """
+    elif notification_type == "confirmation":
+        return f"""
+        Your meeting has been scheduled successfully.
+        
+        Type: {meeting_data['meeting_type']}
+        Time: {meeting_data['start_time']}
+        Duration: {meeting_data['duration_minutes']} minutes
+        Meeting Link: {meeting_data['meeting_url']}
+        """
+
+class TestMeetingTimeCalculation:
+    """Test meeting time calculation and scheduling logic"""
+    
+    def test_business_hours_scheduling(self):
+        """Test scheduling within business hours"""
+        # Test various times
+        monday_10am = datetime(2024, 1, 15, 10, 0)  # Monday 10 AM
+        saturday_10am = datetime(2024, 1, 13, 10, 0)  # Saturday 10 AM
+        monday_6pm = datetime(2024, 1, 15, 18, 0)  # Monday 6 PM
+        
+        assert is_business_hours(monday_10am) == True
+        assert is_business_hours(saturday_10am) == False
+        assert is_business_hours(monday_6pm) == False
+    
+    @pytest.mark.parametrize("duration_minutes,expected_end", [
+        (15, datetime(2024, 1, 15, 14, 15)),
+        (30, datetime(2024, 1, 15, 14, 30)),
+        (45, datetime(2024, 1, 15, 14, 45)),
+        (60, datetime(2024, 1, 15, 15, 0)),
+    ])
+    def test_meeting_duration_calculation(self, duration_minutes, expected_end):
+        """Test meeting duration calculations"""
+        start_time = datetime(2024, 1, 15, 14, 0)  # 2 PM
+        
+        assert start_time + timedelta(minutes=duration_minutes) == expected_end
+    
+    @pytest.mark.parametrize("tz_name,expected_offset", [
+        ("America/New_York", timedelta(hours=-5)),  # EST
+        ("America/Los_Angeles", timedelta(hours=-8)),  # PST
+        ("Europe/London", timedelta(0)),  # GMT
+    ])
+    def test_timezone_handling(self, tz_name, expected_offset):
+        """Test timezone conversion logic"""
+        utc_time = datetime(2024, 1, 15, 19, 0, tzinfo=ZoneInfo("UTC"))  # 7 PM UTC
+        
+        local_time = utc_time.astimezone(ZoneInfo(tz_name))
+        
+        assert local_time.utcoffset() == expected_offset
+        assert local_time == utc_time
+
+class TestMeetingConflictDetection:
+    """Test meeting conflict detection logic"""
+    
+    def test_time_overlap_detection(self):
+        """Test detecting time overlaps between meetings"""
+        assert times_overlap(_M1_START, _M1_END, _M2_START, _M2_END) == True
+        assert times_overlap(_M1_START, _M1_END, _M3_START, _M3_END) == False
+    
+    def test_attendee_availability_check(self):
+        """Test checking attendee availability"""
+        # Check if attendee is available for a meeting overlapping the team meeting
+        available = is_attendee_available(
+            "support@company.com", 
+            _M2_START, 
+            _M2_END, 
+            index_schedule(_ATTENDEE_SCHEDULE)
+        )
+        
+        assert available == False  # Should conflict with existing meeting
+    
+    @pytest.mark.parametrize("start_offset,end_offset,expected", [
+        (timedelta(hours=500, minutes=30), timedelta(hours=501), True),  # Gap between meetings
+        (timedelta(hours=500, minutes=15), timedelta(hours=500, minutes=45), False),  # Overlaps meeting 500
+        (timedelta(hours=499, minutes=45), timedelta(hours=500), True),  # Ends as meeting 500 starts
+        (timedelta(hours=499, minutes=45), timedelta(hours=500, minutes=5), False),  # Runs into meeting 500
+        (timedelta(hours=-2), timedelta(hours=-1), True),  # Before the first meeting
+        (timedelta(hours=1000), timedelta(hours=1001), True),  # After the last meeting
+        (timedelta(hours=10, minutes=45), timedelta(hours=20), False),  # Spans several meetings
+    ])
+    def test_attendee_availability_large_schedule(self, start_offset, end_offset, expected):
+        """Test bisect availability check agrees with a linear scan over 1000 meetings"""
+        start = _BUSY_START + start_offset
+        end = _BUSY_START + end_offset
+        available = is_attendee_available("busy@company.com", start, end, _BUSY_INDEX)
+        
+        assert available == expected
+        # Must agree with a linear scan over every meeting
+        assert available == (not any(
+            times_overlap(start, end, meeting["start"], meeting["end"])
+            for meeting in _BUSY_SCHEDULE["busy@company.com"]
+        ))
+
+class TestMeetingNotifications:
+    """Test meeting notification logic"""
+    
+    def test_notification_timing(self):
+        """Test when notifications should be sent"""
+        meeting_time = datetime(2024, 1, 16, 14, 0)  # Tomorrow 2 PM
+        now = datetime(2024, 1, 15, 10, 0)  # Today 10 AM
+        
+        # Calculate notification times
+        reminder_24h = meeting_time - timedelta(hours=24)
+        reminder_1h = meeting_time - timedelta(hours=1)
+        reminder_15m = meeting_time - timedelta(minutes=15)
+        
+        # Test different scenarios
+        assert should_send_reminder(reminder_24h, reminder_24h, meeting_time) == True
+        assert should_send_reminder(now, reminder_24h, meeting_time) == False  # Too early
+        assert should_send_reminder(meeting_time + timedelta(hours=1), reminder_1h, meeting_time) == False  # Too late
+    
+    def test_notification_content_generation(self):
+        """Test generating notification content"""
+        meeting_data = {
+            "customer_email": "customer@example.com",
+            "meeting_type": "support_followup",
+            "start_time": "2024-01-16T14:00:00Z",
+            "duration_minutes": 30,
+            "meeting_url": "https://meet.google.com/abc-defg-hij",
+            "ticket_id": "TICK-12345"
+        }
+        
+        reminder_content = generate_notification_content(meeting_data, "reminder")
+        confirmation_content = generate_notification_content(meeting_data, "confirmation")
+        
+        assert "Reminder" in reminder_content
+        assert "support_followup" in reminder_content
+        assert "scheduled successfully" in confirmation_content
+        assert meeting_data["meeting_url"] in reminder_content and meeting_data["meeting_url"] in confirmation_content
+
+if __name__ == "__main__":
+    pytest.main([__file__])
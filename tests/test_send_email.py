@@ -3,58 +3,56 @@ Test Email Sending functionality
 """
 
 import pytest
-from unittest.mock import Mock, AsyncMock, patch
-from fastapi.testclient import TestClient
+import time
+from types import SimpleNamespace
 import json
 
-from mcp_service.main import app
+from mcp_service.routes.send_email import BULK_EMAIL_CONCURRENCY
+from mcp_service.utils.gmail_client import GmailClient
+from mcp_service.utils.supabase_client import get_supabase_client
+from tests.fakes.gmail import BlockingSendRecorder, make_gmail_stub
 
-client = TestClient(app)
+# Everything here is mocked, so the module is safe to shard with pytest-xdist
+pytestmark = pytest.mark.local
+
+def _raise_auth_error(*args, **kwargs):
+    raise Exception("Gmail authentication failed")
+
+class _SupabaseStub:
+    """Supabase client stand-in that records which tables were written"""
+    
+    def __init__(self):
+        self.tables = []
+    
+    def table(self, table_name):
+        self.tables.append(table_name)
+        return self
+    
+    def insert(self, data):
+        return self
+    
+    def execute(self):
+        return SimpleNamespace(data=[{"id": "log_123"}])
 
 class TestSendEmail:
     """Test cases for email sending"""
     
     @pytest.fixture
-    def mock_supabase_client(self):
-        """Mock Supabase client"""
-        mock_client = Mock()
-        mock_client.table.return_value.insert.return_value.execute.return_value = Mock(data=[{"id": "log_123"}])
-        return mock_client
+    def supabase_stub(self):
+        """Supabase client stub injected through the app's dependency"""
+        return _SupabaseStub()
     
-    @pytest.fixture
-    def mock_gmail_response(self):
-        """Mock Gmail API response"""
-        return {
-            "message_id": "msg_12345",
-            "thread_id": "thread_67890",
-            "status": "sent"
-        }
+    @pytest.fixture(autouse=True)
+    def _patch_externals(self, client, monkeypatch, gmail_stub, supabase_stub):
+        """Route GmailClient and the Supabase dependency to stubs for every test"""
+        monkeypatch.setattr('mcp_service.routes.send_email.GmailClient', lambda *args, **kwargs: gmail_stub)
+        client.app.dependency_overrides[get_supabase_client] = lambda: supabase_stub
+        yield
+        client.app.dependency_overrides.pop(get_supabase_client, None)
     
-    @pytest.fixture
-    def valid_email_request(self):
-        """Valid email sending request"""
-        return {
-            "to": "customer@example.com",
-            "subject": "Re: Your Support Request",
-            "body": "Thank you for contacting support. Here's the solution to your issue...",
-            "thread_id": None,
-            "template": None,
-            "attachments": [],
-            "cc": [],
-            "bcc": [],
-            "reply_to": None
-        }
-    
-    @pytest.mark.asyncio
-    async def test_send_email_success(self, mock_supabase_client, mock_gmail_response, valid_email_request):
+    def test_send_email_success(self, client, supabase_stub, valid_email_request):
         """Test successful email sending"""
-        with patch('mcp_service.routes.send_email.GmailClient') as mock_gmail:
-            mock_gmail_instance = Mock()
-            mock_gmail_instance.send_email = AsyncMock(return_value=mock_gmail_response)
-            mock_gmail.return_value = mock_gmail_instance
-            
-            with patch('mcp_service.routes.send_email.get_supabase_client', return_value=mock_supabase_client):
-                response = client.post("/mcp/send_email", json=valid_email_request)
+        response = client.post("/mcp/send_email", params={"wait": "true"}, json=dict(valid_email_request))
         
         assert response.status_code == 200
         data = response.json()
@@ -64,30 +62,33 @@ class TestSendEmail:
         assert data["status"] == "sent"
         assert data["recipient"] == "customer@example.com"
         assert data["subject"] == "Re: Your Support Request"
+        assert supabase_stub.tables == ["support_interactions"]
     
-    def test_send_email_invalid_recipient(self):
-        """Test email sending with invalid recipient"""
-        invalid_request = {
-            "to": "invalid_email",  # Invalid email format
-            "subject": "Test Subject",
-            "body": "Test body"
-        }
+    def test_send_email_queued_in_background(self, client, gmail_stub, valid_email_request):
+        """Test email sending defaults to a background task"""
+        response = client.post("/mcp/send_email", json=dict(valid_email_request))
         
-        response = client.post("/mcp/send_email", json=invalid_request)
-        assert response.status_code == 422  # Validation error
-    
-    def test_send_email_missing_required_fields(self):
-        """Test email sending with missing required fields"""
-        incomplete_request = {
-            "to": "test@example.com",
-            # Missing subject and body
-        }
+        assert response.status_code == 202
+        data = response.json()
         
-        response = client.post("/mcp/send_email", json=incomplete_request)
+        assert data["status"] == "queued"
+        assert data["recipient"] == "customer@example.com"
+        assert "message_id" not in data
+        # TestClient runs background tasks before returning the response
+        assert len(gmail_stub.sent) == 1
+    
+    @pytest.mark.parametrize("payload", [
+        # Invalid email format
+        {"to": "invalid_email", "subject": "Test Subject", "body": "Test body"},
+        # Missing subject and body
+        {"to": "test@example.com"},
+    ], ids=["invalid-recipient", "missing-fields"])
+    def test_send_email_validation_error(self, client, payload):
+        """Test email sending rejects invalid requests"""
+        response = client.post("/mcp/send_email", json=payload)
         assert response.status_code == 422  # Validation error
     
-    @pytest.mark.asyncio
-    async def test_send_email_with_template(self, mock_supabase_client, mock_gmail_response):
+    def test_send_email_with_template(self, client, gmail_stub):
         """Test email sending with template"""
         template_request = {
             "to": "customer@example.com",
@@ -96,20 +97,15 @@ class TestSendEmail:
             "template": "solution_response"
         }
         
-        with patch('mcp_service.routes.send_email.GmailClient') as mock_gmail:
-            mock_gmail_instance = Mock()
-            mock_gmail_instance.send_email = AsyncMock(return_value=mock_gmail_response)
-            mock_gmail.return_value = mock_gmail_instance
-            
-            with patch('mcp_service.routes.send_email.get_supabase_client', return_value=mock_supabase_client):
-                response = client.post("/mcp/send_email", json=template_request)
+        response = client.post("/mcp/send_email", params={"wait": "true"}, json=template_request)
         
         assert response.status_code == 200
         # Verify template processing was called
-        mock_gmail_instance.send_email.assert_called_once()
+        assert len(gmail_stub.sent) == 1
+        assert "Thank you for contacting support" in gmail_stub.sent[0]["body"]
     
     @pytest.mark.asyncio
-    async def test_send_bulk_email_success(self, mock_supabase_client, mock_gmail_response):
+    async def test_send_bulk_email_success(self, async_client):
         """Test successful bulk email sending"""
         bulk_request = {
             "recipients": [
@@ -127,13 +123,7 @@ class TestSendEmail:
             "template": None
         }
         
-        with patch('mcp_service.routes.send_email.GmailClient') as mock_gmail:
-            mock_gmail_instance = Mock()
-            mock_gmail_instance.send_email = AsyncMock(return_value=mock_gmail_response)
-            mock_gmail.return_value = mock_gmail_instance
-            
-            with patch('mcp_service.routes.send_email.get_supabase_client', return_value=mock_supabase_client):
-                response = client.post("/mcp/send_bulk_email", json=bulk_request)
+        response = await async_client.post("/mcp/send_bulk_email", json=bulk_request)
         
         assert response.status_code == 200
         data = response.json()
@@ -143,7 +133,36 @@ class TestSendEmail:
         assert data["failed_sends"] == 0
         assert len(data["results"]) == 2
     
-    def test_send_bulk_email_empty_recipients(self):
+    @pytest.mark.asyncio
+    async def test_send_bulk_email_concurrent(self, async_client, monkeypatch):
+        """Test bulk sends run concurrently, bounded by BULK_EMAIL_CONCURRENCY"""
+        recipient_count = BULK_EMAIL_CONCURRENCY * 2
+        # Real GmailClient over a service whose execute() blocks, as httplib2 does
+        recorder = BlockingSendRecorder(delay=0.05)
+        monkeypatch.setattr(GmailClient, '_authenticate', recorder.service)
+        monkeypatch.setattr('mcp_service.routes.send_email.GmailClient', GmailClient)
+        bulk_request = {
+            "recipients": [{"email": f"customer{i}@example.com"} for i in range(recipient_count)],
+            "subject": "Service update",
+            "body": "Your issue has been resolved."
+        }
+        
+        started = time.perf_counter()
+        response = await async_client.post("/mcp/send_bulk_email", json=bulk_request)
+        elapsed = time.perf_counter() - started
+        
+        assert response.status_code == 200
+        data = response.json()
+        
+        assert data["successful_sends"] == recipient_count
+        assert [r["recipient"] for r in data["results"]] == [r["email"] for r in bulk_request["recipients"]]
+        assert recorder.max_in_flight == BULK_EMAIL_CONCURRENCY
+        # One client (and service) per concurrent worker, reused after that
+        assert len(recorder.services) == BULK_EMAIL_CONCURRENCY
+        # Two batches of 50ms rather than recipient_count sequential sends
+        assert elapsed < recipient_count * 0.05 / 2
+    
+    def test_send_bulk_email_empty_recipients(self, client):
         """Test bulk email with empty recipients list"""
         empty_request = {
             "recipients": [],
@@ -155,8 +174,7 @@ class TestSendEmail:
         assert response.status_code == 400
         assert "recipients list is required" in response.json()["detail"]
     
-    @pytest.mark.asyncio
-    async def test_gmail_status_check_connected(self):
+    def test_gmail_status_check_connected(self, client, monkeypatch):
         """Test Gmail status check when connected"""
         mock_profile = {
             "emailAddress": "support@company.com",
@@ -164,12 +182,10 @@ class TestSendEmail:
             "threadsTotal": 800
         }
         
-        with patch('mcp_service.routes.send_email.GmailClient') as mock_gmail:
-            mock_gmail_instance = Mock()
-            mock_gmail_instance.service.users.return_value.getProfile.return_value.execute.return_value = mock_profile
-            mock_gmail.return_value = mock_gmail_instance
-            
-            response = client.get("/mcp/check-gmail-status")
+        gmail_stub = make_gmail_stub(profile=mock_profile)
+        monkeypatch.setattr('mcp_service.routes.send_email.GmailClient', lambda *args, **kwargs: gmail_stub)
+        
+        response = client.get("/mcp/check-gmail-status")
         
         assert response.status_code == 200
         data = response.json()
@@ -178,13 +194,11 @@ class TestSendEmail:
         assert data["email_address"] == "support@company.com"
         assert data["messages_total"] == 1500
     
-    @pytest.mark.asyncio
-    async def test_gmail_status_check_disconnected(self):
+    def test_gmail_status_check_disconnected(self, client, monkeypatch):
         """Test Gmail status check when not connected"""
-        with patch('mcp_service.routes.send_email.GmailClient') as mock_gmail:
-            mock_gmail.side_effect = Exception("Gmail authentication failed")
-            
-            response = client.get("/mcp/check-gmail-status")
+        monkeypatch.setattr('mcp_service.routes.send_email.GmailClient', _raise_auth_error)
+        
+        response = client.get("/mcp/check-gmail-status")
         
         assert response.status_code == 200
         data = response.json()
@@ -195,12 +209,11 @@ class TestSendEmail:
 class TestEmailTemplates:
     """Test email template processing"""
     
-    @pytest.mark.asyncio
-    async def test_solution_response_template(self):
+    def test_solution_response_template(self):
         """Test solution response template processing"""
         from mcp_service.routes.send_email import process_email_template
         
-        result = await process_email_template(
+        result = process_email_template(
             template_name="solution_response",
             body="Here's how to reset your password...",
             recipient="customer@example.com",
@@ -212,12 +225,11 @@ class TestEmailTemplates:
         assert "Here's how to reset your password..." in result
         assert "SuperTickets.AI Support Team" in result
     
-    @pytest.mark.asyncio
-    async def test_ticket_created_template(self):
+    def test_ticket_created_template(self):
         """Test ticket created template processing"""
         from mcp_service.routes.send_email import process_email_template
         
-        result = await process_email_template(
+        result = process_email_template(
             template_name="ticket_created",
             body="Your ticket has been created successfully.",
             recipient="customer@example.com",
@@ -231,13 +243,27 @@ class TestEmailTemplates:
         assert "We've received your support request" in result
         assert "Ticket #TICK-12345" in result
     
-    @pytest.mark.asyncio
-    async def test_unknown_template(self):
+    def test_template_partial_personalization(self):
+        """Test missing personalization values fall back to template defaults"""
+        from mcp_service.routes.send_email import process_email_template
+        
+        result = process_email_template(
+            template_name="ticket_created",
+            body="Your ticket has been created successfully.",
+            recipient="customer@example.com",
+            personalization={"customer_name": "Jane Smith"}
+        )
+        
+        assert "Hello Jane Smith" in result
+        assert "Your ticket has been created successfully." in result
+        assert "Ticket #TBD" in result
+    
+    def test_unknown_template(self):
         """Test processing with unknown template"""
         from mcp_service.routes.send_email import process_email_template
         
         original_body = "This is the original body"
-        result = await process_email_template(
+        result = process_email_template(
             template_name="unknown_template",
             body=original_body,
             recipient="customer@example.com"
@@ -275,6 +301,50 @@ class TestEmailTemplates:
         # Should replace available values and leave missing ones as placeholders
         assert "Hello John Doe" in result
         assert "{ticket_id}" in result
+    
+    def test_personalize_content_literal_braces(self):
+        """Test content personalization keeps literal braces that aren't placeholders"""
+        from mcp_service.routes.send_email import personalize_content
+        
+        content = 'Hello {customer_name}, set {"debug": true} in your config.'
+        
+        result = personalize_content(content, {"customer_name": "John Doe"})
+        
+        assert result == 'Hello John Doe, set {"debug": true} in your config.'
+    
+    @pytest.mark.parametrize("content", [
+        "No placeholders here",
+        "Hello {customer_name}, your ticket {ticket_id} has been updated.",
+        'Hello {customer_name}, set {"debug": true} in your config.',
+        "Ticket {ticket_id!r} for {customer_name:>12}",
+        "Escaped {{braces}} and }} around {customer_name}",
+        "Ticket {ticket_id:d}",
+        "Hello {0} and {customer.name}",
+    ], ids=["plain", "fields", "literal-braces", "format-spec", "escaped", "bad-spec", "non-identifier"])
+    @pytest.mark.parametrize("personalization", [
+        {"customer_name": "John Doe", "ticket_id": "TICK-12345"},
+        {"customer_name": "John Doe"},
+        {},
+    ], ids=["full", "partial", "empty"])
+    def test_compile_personalizer_matches_personalize_content(self, content, personalization):
+        """Test the compiled renderer gives the same output as personalize_content"""
+        from mcp_service.routes.send_email import compile_personalizer, personalize_content
+        
+        render = compile_personalizer(content)
+        
+        assert render(personalization) == personalize_content(content, personalization)
+    
+    def test_compile_personalizer_does_not_reparse(self):
+        """Test the compiled renderer never goes back to str.format_map()"""
+        from mcp_service.routes.send_email import compile_personalizer
+        
+        class _NoFormatMap(str):
+            def format_map(self, mapping):
+                raise AssertionError("template re-parsed per recipient")
+        
+        render = compile_personalizer(_NoFormatMap("Hello {customer_name}, ticket {ticket_id}"))
+        
+        assert render({"customer_name": "John Doe"}) == "Hello John Doe, ticket {ticket_id}"
 
 if __name__ == "__main__":
     pytest.main([__file__])
\ No newline at end of file
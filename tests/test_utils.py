@@ -3,84 +3,176 @@ Test Utility functions and clients
 """
 
 import pytest
-from unittest.mock import Mock, AsyncMock, patch, MagicMock
-import os
+import re
+import html
+import io
+import base64
+import json
+import numpy as np
+import httpx
+from unittest.mock import ANY, Mock, patch, MagicMock
 from datetime import datetime, timedelta
+from functools import partial
+from types import MappingProxyType, SimpleNamespace
+
+from mcp_service.utils import supabase_client
+from mcp_service.utils.supabase_client import get_supabase_client, SupabaseClient, SUPABASE_HTTP_LIMITS
+from mcp_service.utils.gmail_client import GmailClient
+from mcp_service.utils.bedrock_client import BedrockClient
+from mcp_service.utils.superops_api import SuperOpsClient
+from mcp_service.utils.embedding_search import EmbeddingSearch
+from mcp_service.utils.google_calendar import GoogleCalendarClient
+
+# Patterns for the utility helpers, compiled once per module
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+_SCRIPT_RE = re.compile(r'<script.*?</script>', re.IGNORECASE | re.DOTALL)
+
+# str.translate table deleting every ASCII non-digit
+_NON_DIGITS = {c: None for c in range(128) if not chr(c).isdigit()}
+
+def is_valid_email(email):
+    return _EMAIL_RE.match(email) is not None
+
+def format_phone_number(phone):
+    # Remove all non-digit characters; the table only covers ASCII, so other
+    # separators (e.g. en dashes) go through the Unicode-aware regex
+    if phone.isascii():
+        digits = phone.translate(_NON_DIGITS)
+    else:
+        digits = re.sub(r'\D', '', phone)
+    
+    # Format as +1XXXXXXXXXX for US numbers
+    if len(digits) == 10:
+        return f"+1{digits}"
+    elif len(digits) == 11 and digits.startswith('1'):
+        return f"+{digits}"
+    else:
+        return phone  # Return as-is if not standard format
+
+def _client_factory(*methods):
+    """
+    new_callable for patch(): a fresh client constructor per test whose
+    instances only allow methods. Google discovery resources and boto3 clients
+    generate their methods at runtime, so there is no class to spec against
+    """
+    return lambda: Mock(return_value=Mock(spec=list(methods)))
+
+# Canned Bedrock invoke_model bodies, keyed by the client method that requests them
+_BEDROCK_BODIES = MappingProxyType({
+    "analyze_issue": json.dumps({"issue_summary": "Login problem", "urgency_level": "medium"}).encode(),
+    "extract_call_info": json.dumps({"customer_name": "John Doe", "issue_description": "Login issues"}).encode()
+})
+
+def _bedrock_response(method):
+    """invoke_model() response whose body streams the canned JSON for method"""
+    return {"body": io.BytesIO(_BEDROCK_BODIES[method])}
+
+# Fixed timestamps; _TEST_DT_ISO is written out rather than derived from
+# _TEST_DT so the formatting test still checks isoformat()
+_TEST_DT = datetime(2024, 1, 15, 14, 30, 0)
+_TEST_DT_ISO = "2024-01-15T14:30:00"
+_MEETING_START_ISO = "2024-01-16T14:00:00Z"
+_MEETING_END_ISO = "2024-01-16T14:30:00Z"
+_WINDOW_END_ISO = "2024-01-16T15:00:00Z"
+_BUSY_START_ISO = "2024-01-16T14:30:00Z"
+_BUSY_END_ISO = "2024-01-16T15:30:00Z"
+
+# Stored OAuth token that needs no refresh, for the Google client tests
+_VALID_CREDENTIALS = SimpleNamespace(valid=True, expired=False, refresh_token=None, token="test")
+
+# Gmail API list/get responses, built once; the body is base64-encoded at import
+# the way the API delivers it
+_GMAIL_MESSAGE_BODY = "Test body"
+_GMAIL_LIST_FIXTURE = MappingProxyType({"messages": [{"id": "msg_123"}]})
+_GMAIL_MESSAGE_FIXTURE = MappingProxyType({
+    "id": "msg_123",
+    "threadId": "thread_456",
+    "payload": {
+        "headers": [
+            {"name": "Subject", "value": "Test Subject"},
+            {"name": "From", "value": "sender@example.com"},
+            {"name": "Date", "value": "Mon, 15 Jan 2024 10:00:00 +0000"}
+        ],
+        "mimeType": "text/plain",
+        "body": {
+            "data": base64.urlsafe_b64encode(_GMAIL_MESSAGE_BODY.encode()).decode()
+        }
+    }
+})
+
+# OpenAI embeddings response shared by every embedding test; the vector is a
+# tuple so no test can mutate it for the others
+_FAKE_EMBEDDING = (0.1,) * 1536
+_FAKE_EMBEDDING_RESPONSE = SimpleNamespace(data=[SimpleNamespace(embedding=_FAKE_EMBEDDING)])
+
+# Every client is mocked and env changes go through monkeypatch, so the module
+# is safe to shard with pytest-xdist
+pytestmark = pytest.mark.local
 
 class TestSupabaseClient:
     """Test Supabase client functionality"""
     
     @pytest.fixture
-    def mock_supabase_env(self):
+    def mock_supabase_env(self, monkeypatch):
         """Mock Supabase environment variables"""
-        with patch.dict(os.environ, {
-            'SUPABASE_URL': 'https://test.supabase.co',
-            'SUPABASE_KEY': 'test_key'
-        }):
-            yield
+        monkeypatch.setenv('SUPABASE_URL', 'https://test.supabase.co')
+        monkeypatch.setenv('SUPABASE_KEY', 'test_key')
     
-    def test_supabase_client_initialization(self, mock_supabase_env):
+    def test_supabase_client_initialization(self, mock_supabase_env, monkeypatch):
         """Test Supabase client initialization"""
+        # Drop the cached client so create_client is actually reached
+        monkeypatch.setattr(supabase_client, '_supabase_client', None)
         with patch('mcp_service.utils.supabase_client.create_client') as mock_create:
             mock_client = Mock()
             mock_create.return_value = mock_client
             
-            from mcp_service.utils.supabase_client import get_supabase_client
-            
             client = get_supabase_client()
             
-            assert client is not None
+            assert client.client is mock_client
             mock_create.assert_called_once_with(
                 'https://test.supabase.co',
-                'test_key'
+                'test_key',
+                options=ANY
             )
+            assert mock_create.call_args.kwargs["options"].httpx_client is client.http_client
     
-    def test_supabase_client_missing_env(self):
-        """Test Supabase client with missing environment variables"""
-        with patch.dict(os.environ, {}, clear=True):
-            from mcp_service.utils.supabase_client import get_supabase_client
+    def test_supabase_client_uses_http2_pool(self, mock_supabase_env):
+        """Test Supabase client shares an HTTP/2 connection pool"""
+        with patch('mcp_service.utils.supabase_client.create_client') as mock_create, \
+             patch('mcp_service.utils.supabase_client.httpx.Client') as mock_http_client:
+            client = SupabaseClient()
             
-            with pytest.raises(Exception):
-                get_supabase_client()
+            mock_http_client.assert_called_once_with(http2=True, timeout=10.0, limits=SUPABASE_HTTP_LIMITS)
+            options = mock_create.call_args.kwargs["options"]
+            assert options.httpx_client is client.http_client
+    
+    def test_supabase_client_missing_env(self, monkeypatch):
+        """Test Supabase client with missing environment variables"""
+        monkeypatch.delenv('SUPABASE_URL', raising=False)
+        monkeypatch.delenv('SUPABASE_KEY', raising=False)
+        # Drop the cached client so the env check actually runs
+        monkeypatch.setattr(supabase_client, '_supabase_client', None)
+        
+        with pytest.raises(Exception):
+            get_supabase_client()
 
+@patch('os.path.exists', Mock(return_value=True))
+@patch('mcp_service.utils.gmail_client.build', new_callable=_client_factory("users"))
+@patch('mcp_service.utils.gmail_client.Credentials', **{"from_authorized_user_file.return_value": _VALID_CREDENTIALS})
 class TestGmailClient:
     """Test Gmail client functionality"""
     
-    @pytest.fixture
-    def mock_gmail_credentials(self):
-        """Mock Gmail credentials"""
-        with patch('os.path.exists', return_value=True):
-            with patch('mcp_service.utils.gmail_client.Credentials') as mock_creds:
-                mock_creds.from_authorized_user_file.return_value = Mock(valid=True)
-                yield mock_creds
-    
-    @pytest.fixture
-    def mock_gmail_service(self):
-        """Mock Gmail service"""
-        with patch('mcp_service.utils.gmail_client.build') as mock_build:
-            mock_service = Mock()
-            mock_build.return_value = mock_service
-            yield mock_service
-    
-    def test_gmail_client_initialization(self, mock_gmail_credentials, mock_gmail_service):
-        """Test Gmail client initialization"""
-        from mcp_service.utils.gmail_client import GmailClient
-        
-        client = GmailClient()
-        
-        assert client.service is not None
-    
     @pytest.mark.asyncio
-    async def test_gmail_send_email(self, mock_gmail_credentials, mock_gmail_service):
+    async def test_gmail_send_email(self, mock_creds, mock_build):
         """Test Gmail email sending"""
-        from mcp_service.utils.gmail_client import GmailClient
-        
         # Mock the send response
         mock_response = {
             "id": "msg_123",
             "threadId": "thread_456"
         }
-        mock_gmail_service.users.return_value.messages.return_value.send.return_value.execute.return_value = mock_response
+        mock_build.return_value.configure_mock(**{
+            "users.return_value.messages.return_value.send.return_value.execute.return_value": mock_response
+        })
         
         client = GmailClient()
         
@@ -100,33 +192,12 @@ class TestGmailClient:
         assert result["status"] == "sent"
     
     @pytest.mark.asyncio
-    async def test_gmail_get_messages(self, mock_gmail_credentials, mock_gmail_service):
+    async def test_gmail_get_messages(self, mock_creds, mock_build):
         """Test Gmail message retrieval"""
-        from mcp_service.utils.gmail_client import GmailClient
-        
-        # Mock messages list response
-        mock_list_response = {
-            "messages": [{"id": "msg_123"}]
-        }
-        mock_gmail_service.users.return_value.messages.return_value.list.return_value.execute.return_value = mock_list_response
-        
-        # Mock individual message response
-        mock_message_response = {
-            "id": "msg_123",
-            "threadId": "thread_456",
-            "payload": {
-                "headers": [
-                    {"name": "Subject", "value": "Test Subject"},
-                    {"name": "From", "value": "sender@example.com"},
-                    {"name": "Date", "value": "Mon, 15 Jan 2024 10:00:00 +0000"}
-                ],
-                "mimeType": "text/plain",
-                "body": {
-                    "data": "VGVzdCBib2R5"  # Base64 encoded "Test body"
-                }
-            }
-        }
-        mock_gmail_service.users.return_value.messages.return_value.get.return_value.execute.return_value = mock_message_response
+        mock_build.return_value.configure_mock(**{
+            "users.return_value.messages.return_value.list.return_value.execute.return_value": _GMAIL_LIST_FIXTURE,
+            "users.return_value.messages.return_value.get.return_value.execute.return_value": _GMAIL_MESSAGE_FIXTURE
+        })
         
         client = GmailClient()
         
@@ -135,11 +206,10 @@ class TestGmailClient:
         assert len(messages) == 1
         assert messages[0]["id"] == "msg_123"
         assert messages[0]["subject"] == "Test Subject"
+        assert messages[0]["body"] == _GMAIL_MESSAGE_BODY
     
-    def test_gmail_create_message(self, mock_gmail_credentials, mock_gmail_service):
+    def test_gmail_create_message(self, mock_creds, mock_build):
         """Test Gmail message creation"""
-        from mcp_service.utils.gmail_client import GmailClient
-        
         client = GmailClient()
         
         message = client._create_message(
@@ -151,28 +221,14 @@ class TestGmailClient:
         assert "raw" in message
         assert isinstance(message["raw"], str)
 
+@patch('boto3.client', new_callable=_client_factory("invoke_model"))
 class TestBedrockClient:
     """Test AWS Bedrock client functionality"""
     
-    @pytest.fixture
-    def mock_bedrock_client(self):
-        """Mock Bedrock client"""
-        with patch('boto3.client') as mock_boto3:
-            mock_client = Mock()
-            mock_boto3.return_value = mock_client
-            yield mock_client
-    
     @pytest.mark.asyncio
-    async def test_bedrock_analyze_issue(self, mock_bedrock_client):
+    async def test_bedrock_analyze_issue(self, mock_boto3):
         """Test Bedrock issue analysis"""
-        # Mock Bedrock response
-        mock_response = {
-            "body": Mock()
-        }
-        mock_response["body"].read.return_value = b'{"issue_summary": "Login problem", "urgency_level": "medium"}'
-        mock_bedrock_client.invoke_model.return_value = mock_response
-        
-        from mcp_service.utils.bedrock_client import BedrockClient
+        mock_boto3.return_value.invoke_model.return_value = _bedrock_response("analyze_issue")
         
         client = BedrockClient()
         
@@ -185,15 +241,9 @@ class TestBedrockClient:
         assert "urgency_level" in result
     
     @pytest.mark.asyncio
-    async def test_bedrock_extract_call_info(self, mock_bedrock_client):
+    async def test_bedrock_extract_call_info(self, mock_boto3):
         """Test Bedrock call information extraction"""
-        mock_response = {
-            "body": Mock()
-        }
-        mock_response["body"].read.return_value = b'{"customer_name": "John Doe", "issue_description": "Login issues"}'
-        mock_bedrock_client.invoke_model.return_value = mock_response
-        
-        from mcp_service.utils.bedrock_client import BedrockClient
+        mock_boto3.return_value.invoke_model.return_value = _bedrock_response("extract_call_info")
         
         client = BedrockClient()
         
@@ -209,28 +259,25 @@ class TestSuperOpsClient:
     """Test SuperOps client functionality"""
     
     @pytest.fixture
-    def mock_superops_env(self):
+    def mock_superops_env(self, monkeypatch):
         """Mock SuperOps environment variables"""
-        with patch.dict(os.environ, {
-            'SUPEROPS_API_URL': 'https://api.superops.com/graphql',
-            'SUPEROPS_API_KEY': 'test_api_key'
-        }):
-            yield
+        monkeypatch.setenv('SUPEROPS_API_URL', 'https://api.superops.com/graphql')
+        monkeypatch.setenv('SUPEROPS_API_KEY', 'test_api_key')
     
     @pytest.fixture
-    def mock_http_client(self):
-        """Mock HTTP client for SuperOps"""
-        with patch('httpx.AsyncClient') as mock_client:
-            mock_instance = Mock()
-            mock_client.return_value.__aenter__.return_value = mock_instance
-            yield mock_instance
+    def graphql_responses(self, monkeypatch):
+        """Queue of responses served to SuperOps GraphQL calls in-process"""
+        responses = []
+        # The real AsyncClient runs end to end; only the transport is swapped out
+        transport = httpx.MockTransport(lambda request: responses.pop(0))
+        monkeypatch.setattr('httpx.AsyncClient', partial(httpx.AsyncClient, transport=transport))
+        return responses
     
     @pytest.mark.asyncio
-    async def test_superops_create_ticket(self, mock_superops_env, mock_http_client):
+    async def test_superops_create_ticket(self, mock_superops_env, graphql_responses):
         """Test SuperOps ticket creation"""
         # Mock GraphQL response
-        mock_response = Mock()
-        mock_response.json.return_value = {
+        graphql_responses.append(httpx.Response(200, json={
             "data": {
                 "createTicket": {
                     "ticket_id": "TICK-12345",
@@ -238,10 +285,7 @@ class TestSuperOpsClient:
                     "status": "open"
                 }
             }
-        }
-        mock_http_client.post.return_value = mock_response
-        
-        from mcp_service.utils.superops_api import SuperOpsClient
+        }))
         
         client = SuperOpsClient()
         
@@ -260,20 +304,16 @@ class TestSuperOpsClient:
         assert result["status"] == "open"
     
     @pytest.mark.asyncio
-    async def test_superops_create_callback_task(self, mock_superops_env, mock_http_client):
+    async def test_superops_create_callback_task(self, mock_superops_env, graphql_responses):
         """Test SuperOps callback task creation"""
-        mock_response = Mock()
-        mock_response.json.return_value = {
+        graphql_responses.append(httpx.Response(200, json={
             "data": {
                 "createTask": {
                     "callback_id": "CB-001",
                     "status": "scheduled"
                 }
             }
-        }
-        mock_http_client.post.return_value = mock_response
-        
-        from mcp_service.utils.superops_api import SuperOpsClient
+        }))
         
         client = SuperOpsClient()
         
@@ -291,42 +331,35 @@ class TestSuperOpsClient:
 class TestEmbeddingSearch:
     """Test embedding search functionality"""
     
-    @pytest.fixture
+    @pytest.fixture(scope="class")
     def mock_openai_client(self):
         """Mock OpenAI client"""
         with patch('openai.OpenAI') as mock_openai:
-            mock_client = Mock()
-            mock_response = Mock()
-            mock_response.data = [Mock()]
-            mock_response.data[0].embedding = [0.1] * 1536
-            mock_client.embeddings.create.return_value = mock_response
+            mock_client = Mock(**{"embeddings.create.return_value": _FAKE_EMBEDDING_RESPONSE})
             mock_openai.return_value = mock_client
             yield mock_client
     
-    @pytest.fixture
+    @pytest.fixture(scope="class")
     def mock_supabase_client(self):
-        """Mock Supabase client for embedding search"""
-        mock_client = Mock()
-        mock_client.search_knowledge_base = AsyncMock()
-        return mock_client
+        """Mock Supabase client for embedding search, shared by the class"""
+        # Speccing the class makes its async methods AsyncMocks automatically
+        return Mock(spec=SupabaseClient)
     
     @pytest.mark.asyncio
     async def test_create_embedding(self, mock_openai_client, mock_supabase_client):
         """Test embedding creation"""
-        from mcp_service.utils.embedding_search import EmbeddingSearch
-        
         search = EmbeddingSearch(mock_supabase_client)
         
         embedding = await search.create_embedding("test text")
         
-        assert len(embedding) == 1536
-        assert all(isinstance(x, float) for x in embedding)
+        # No dtype argument - a list of Python floats must come back as float64
+        arr = np.asarray(embedding)
+        assert arr.shape == (1536,)
+        assert np.issubdtype(arr.dtype, np.floating)
     
     @pytest.mark.asyncio
     async def test_vector_search(self, mock_openai_client, mock_supabase_client):
         """Test vector similarity search"""
-        from mcp_service.utils.embedding_search import EmbeddingSearch
-        
         # Mock search results
         mock_results = [
             {
@@ -335,6 +368,7 @@ class TestEmbeddingSearch:
                 "similarity_score": 0.95
             }
         ]
+        mock_supabase_client.search_knowledge_base.reset_mock(return_value=True, side_effect=True)
         mock_supabase_client.search_knowledge_base.return_value = mock_results
         
         search = EmbeddingSearch(mock_supabase_client)
@@ -348,63 +382,54 @@ class TestEmbeddingSearch:
         assert len(results) == 1
         assert results[0]["similarity_score"] == 0.95
     
-    def test_cosine_similarity(self, mock_supabase_client):
+    @pytest.mark.parametrize("vec1,vec2,expected", [
+        ([1.0, 0.0, 0.0], [1.0, 0.0, 0.0], 1.0),
+        ([1.0, 0.0, 0.0], [0.0, 1.0, 0.0], 0.0),
+        ([1.0, 2.0, 3.0], [4.0, 5.0, 6.0], 0.9746),
+    ], ids=["identical", "orthogonal", "general"])
+    def test_cosine_similarity(self, mock_supabase_client, vec1, vec2, expected):
         """Test cosine similarity calculation"""
-        from mcp_service.utils.embedding_search import EmbeddingSearch
-        
         search = EmbeddingSearch(mock_supabase_client)
         
-        # Test identical vectors
-        vec1 = [1.0, 0.0, 0.0]
-        vec2 = [1.0, 0.0, 0.0]
         similarity = search.cosine_similarity(vec1, vec2)
-        assert abs(similarity - 1.0) < 0.001
+        np.testing.assert_allclose(similarity, expected, atol=1e-3)
         
-        # Test orthogonal vectors
-        vec3 = [0.0, 1.0, 0.0]
-        similarity = search.cosine_similarity(vec1, vec3)
-        assert abs(similarity - 0.0) < 0.001
+        # Parity with a direct BLAS dot/norm reference
+        reference = float(np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2)))
+        assert abs(similarity - reference) < 1e-9
 
+@patch('os.path.exists', Mock(return_value=True))
+@patch('mcp_service.utils.google_calendar.build', new_callable=_client_factory("events", "freebusy"))
+@patch('mcp_service.utils.google_calendar.Credentials', **{"from_authorized_user_file.return_value": _VALID_CREDENTIALS})
 class TestCalendarClient:
     """Test Google Calendar client functionality"""
     
-    @pytest.fixture
-    def mock_calendar_credentials(self):
-        """Mock Calendar credentials"""
-        with patch('os.path.exists', return_value=True):
-            with patch('mcp_service.utils.calendar_client.Credentials') as mock_creds:
-                mock_creds.from_authorized_user_file.return_value = Mock(valid=True)
-                yield mock_creds
-    
-    @pytest.fixture
-    def mock_calendar_service(self):
-        """Mock Calendar service"""
-        with patch('mcp_service.utils.calendar_client.build') as mock_build:
-            mock_service = Mock()
-            mock_build.return_value = mock_service
-            yield mock_service
-    
     @pytest.mark.asyncio
-    async def test_calendar_create_meeting(self, mock_calendar_credentials, mock_calendar_service):
+    async def test_calendar_create_meeting(self, mock_creds, mock_build):
         """Test Calendar meeting creation"""
-        from mcp_service.utils.calendar_client import GoogleCalendarClient
-        
         # Mock event creation response
         mock_event_response = {
             "id": "event_123",
             "htmlLink": "https://calendar.google.com/event/123",
-            "start": {"dateTime": "2024-01-16T14:00:00Z"},
-            "end": {"dateTime": "2024-01-16T14:30:00Z"},
+            "start": {"dateTime": _MEETING_START_ISO},
+            "end": {"dateTime": _MEETING_END_ISO},
             "attendees": [{"email": "customer@example.com"}],
-            "hangoutLink": "https://meet.google.com/abc-defg-hij"
+            "hangoutLink": "https://meet.google.com/abc-defg-hij",
+            "conferenceData": {
+                "entryPoints": [{"entryPointType": "video", "uri": "https://meet.google.com/abc-defg-hij"}]
+            }
         }
-        mock_calendar_service.events.return_value.insert.return_value.execute.return_value = mock_event_response
+        mock_build.return_value.configure_mock(**{
+            "events.return_value.insert.return_value.execute.return_value": mock_event_response
+        })
         
         client = GoogleCalendarClient()
         
         meeting_data = {
-            "customer_email": "customer@example.com",
-            "start_time": "2024-01-16T14:00:00Z",
+            "summary": "Support Follow-up",
+            "description": "Follow-up on ticket TICK-12345",
+            "attendees": ["customer@example.com"],
+            "start_time": _MEETING_START_ISO,
             "duration_minutes": 30,
             "meeting_type": "support_followup"
         }
@@ -415,10 +440,8 @@ class TestCalendarClient:
         assert result["meeting_url"] == "https://meet.google.com/abc-defg-hij"
     
     @pytest.mark.asyncio
-    async def test_calendar_check_availability(self, mock_calendar_credentials, mock_calendar_service):
+    async def test_calendar_check_availability(self, mock_creds, mock_build):
         """Test Calendar availability checking"""
-        from mcp_service.utils.calendar_client import GoogleCalendarClient
-        
         # Mock freebusy response
         mock_freebusy_response = {
             "calendars": {
@@ -428,94 +451,86 @@ class TestCalendarClient:
                 "support@company.com": {
                     "busy": [
                         {
-                            "start": "2024-01-16T14:30:00Z",
-                            "end": "2024-01-16T15:30:00Z"
+                            "start": _BUSY_START_ISO,
+                            "end": _BUSY_END_ISO
                         }
                     ]
                 }
             }
         }
-        mock_calendar_service.freebusy.return_value.query.return_value.execute.return_value = mock_freebusy_response
+        mock_build.return_value.configure_mock(**{
+            "freebusy.return_value.query.return_value.execute.return_value": mock_freebusy_response
+        })
         
         client = GoogleCalendarClient()
         
-        availability_data = {
-            "attendees": ["customer@example.com", "support@company.com"],
-            "start_time": "2024-01-16T14:00:00Z",
-            "end_time": "2024-01-16T15:00:00Z"
-        }
-        
-        result = await client.check_availability(availability_data)
+        result = await client.check_availability(
+            ["customer@example.com", "support@company.com"],
+            datetime.fromisoformat(_MEETING_START_ISO),
+            datetime.fromisoformat(_WINDOW_END_ISO)
+        )
         
         assert result["customer@example.com"]["available"] == True
         assert result["support@company.com"]["available"] == False
         assert len(result["support@company.com"]["busy_times"]) == 1
 
+class TestGoogleClients:
+    """Test behaviour shared by the Google API clients"""
+    
+    @pytest.mark.parametrize("client_cls", [GmailClient, GoogleCalendarClient], ids=["gmail", "calendar"])
+    def test_google_client_initialization(self, client_cls):
+        """Test Google API clients build their service from a stored token"""
+        module_path = client_cls.__module__
+        
+        with patch('os.path.exists', return_value=True), \
+             patch(f"{module_path}.Credentials", **{"from_authorized_user_file.return_value": _VALID_CREDENTIALS}), \
+             patch(f"{module_path}.build", new_callable=_client_factory()) as mock_build:
+            client = client_cls()
+        
+        assert client.service is mock_build.return_value
+
 class TestUtilityFunctions:
     """Test utility functions"""
     
     def test_datetime_formatting(self):
         """Test datetime formatting utilities"""
-        from datetime import datetime
-        
         # Test ISO format
-        dt = datetime(2024, 1, 15, 14, 30, 0)
-        iso_string = dt.isoformat()
-        
-        assert iso_string == "2024-01-15T14:30:00"
+        assert _TEST_DT.isoformat() == _TEST_DT_ISO
         
         # Test parsing
-        parsed_dt = datetime.fromisoformat(iso_string)
-        assert parsed_dt == dt
+        assert datetime.fromisoformat(_TEST_DT_ISO) == _TEST_DT
     
-    def test_email_validation(self):
-        """Test email validation utility"""
-        import re
-        
-        def is_valid_email(email):
-            pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-            return re.match(pattern, email) is not None
-        
+    @pytest.mark.parametrize("email,expected", [
         # Valid emails
-        assert is_valid_email("user@example.com") == True
-        assert is_valid_email("test.email+tag@domain.co.uk") == True
-        
+        ("user@example.com", True),
+        ("test.email+tag@domain.co.uk", True),
         # Invalid emails
-        assert is_valid_email("invalid_email") == False
-        assert is_valid_email("@domain.com") == False
-        assert is_valid_email("user@") == False
+        ("invalid_email", False),
+        ("@domain.com", False),
+        ("user@", False),
+    ])
+    def test_email_validation(self, email, expected):
+        """Test email validation utility"""
+        assert is_valid_email(email) is expected
     
-    def test_phone_number_formatting(self):
+    @pytest.mark.parametrize("phone,expected", [
+        ("(555) 123-4567", "+15551234567"),
+        ("555-123-4567", "+15551234567"),
+        ("15551234567", "+15551234567"),
+        ("555\u2013123\u20134567", "+15551234567"),
+    ])
+    def test_phone_number_formatting(self, phone, expected):
         """Test phone number formatting utility"""
-        import re
-        
-        def format_phone_number(phone):
-            # Remove all non-digit characters
-            digits = re.sub(r'\D', '', phone)
-            
-            # Format as +1XXXXXXXXXX for US numbers
-            if len(digits) == 10:
-                return f"+1{digits}"
-            elif len(digits) == 11 and digits.startswith('1'):
-                return f"+{digits}"
-            else:
-                return phone  # Return as-is if not standard format
-        
-        assert format_phone_number("(555) 123-4567") == "+15551234567"
-        assert format_phone_number("555-123-4567") == "+15551234567"
-        assert format_phone_number("15551234567") == "+15551234567"
+        assert format_phone_number(phone) == expected
     
     def test_text_sanitization(self):
         """Test text sanitization utility"""
-        import html
-        
         def sanitize_text(text):
             # HTML escape
             escaped = html.escape(text)
             
             # Remove potential script tags (basic)
-            import re
-            cleaned = re.sub(r'<script.*?</script>', '', escaped, flags=re.IGNORECASE | re.DOTALL)
+            cleaned = _SCRIPT_RE.sub('', escaped)
             
             return cleaned
         